@@ -0,0 +1,130 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import time
+import asyncio
+import optparse
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+# we need to import python modules from the $SUMO_HOME/tools directory
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+from sumolib import checkBinary  # noqa
+from sumolib.miscutils import getFreeSocketPort  # noqa
+import traci  # noqa
+import topology  # noqa
+import driver  # noqa
+import runner  # noqa
+from sweep import parse_seeds  # noqa
+
+
+def launch(scenario):
+    """Start the sumo server of scenario (netFile, routeFile, tripinfo, seed) without waiting for it."""
+    netFile, routeFile, tripinfo, seed = scenario
+    port = getFreeSocketPort()
+    proc = subprocess.Popen([checkBinary('sumo'), "-c", "data/cross2x2.sumocfg", "-n", netFile, "-r", routeFile,
+                             "--seed", str(seed), "--tripinfo-output", tripinfo, "--no-step-log", "true",
+                             "--remote-port", str(port)], stdout=subprocess.DEVNULL)
+    return port, proc
+
+
+def drive(conn, netFile, flowWindow):
+    """Run the Webster controller on conn; returns (steps, average waiting time)."""
+    steps = [0]
+
+    def count(step, avgWait):
+        steps[0] = step
+
+    avgWait = driver.run(runner.controller(), conn, netFile, flowWindow, monitor=count)
+    return steps[0], avgWait
+
+
+async def run_scenarios(scenarios, flowWindow=300):
+    """Run one simulation per scenario concurrently from this interpreter.
+
+    All sumo servers are launched first, so they load in parallel, and each
+    gets its own unlabelled connection, which traci allows to be used from
+    its own thread. Every connection is driven in a worker thread: a step
+    mostly waits on the socket for the reply to simulationStep, with the
+    subscribed observations, and the GIL is released while waiting, so the
+    other scenarios compute and the sumo servers simulate meanwhile.
+    Returns (steps, average waiting time) per scenario.
+    """
+    # parse the networks once here, the topology cache is not safe across threads
+    for netFile in set(s[0] for s in scenarios):
+        topology.load(netFile)
+    servers = [launch(scenario) for scenario in scenarios]
+    conns = [traci.connect(port, numRetries=60, proc=proc) for port, proc in servers]
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(len(scenarios)) as executor:
+        return await asyncio.gather(*[loop.run_in_executor(executor, drive, conn, scenario[0], flowWindow)
+                                      for conn, scenario in zip(conns, scenarios)])
+
+
+def run_process(job):
+    """One-process-per-run baseline: run the scenario over traci in this process alone."""
+    scenario, flowWindow = job
+    port, proc = launch(scenario)
+    return drive(traci.connect(port, numRetries=60, proc=proc), scenario[0], flowWindow)
+
+
+def scenarios(netFile, seeds, outDir):
+    """Write the demand of every seed and return the scenarios."""
+    result = []
+    for seed in seeds:
+        name = os.path.join(outDir, "{}_{}".format(os.path.basename(netFile).split(".")[0], seed))
+        runner.generate_routeFile(netFile, name + ".rou.xml", seed)
+        result.append((netFile, name + ".rou.xml", name + ".tripinfo.xml", seed))
+    return result
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("-n", "--net-file", default="data/cross2x3.net.xml", help="network to simulate")
+    optParser.add_option("--seeds", default="1-24", help="one scenario per seed, e.g. 1-24 or 1,5,9")
+    optParser.add_option("--flow-window", type="int", default=300,
+                         help="number of seconds the flow estimate is averaged over")
+    optParser.add_option("--baseline", action="store_true", default=False,
+                         help="also run the scenarios with one process per run and compare")
+    optParser.add_option("-j", "--jobs", type="int", default=multiprocessing.cpu_count(),
+                         help="number of parallel processes of the baseline")
+    optParser.add_option("--output-dir", default="sweep_output",
+                         help="directory for the per-run route and tripinfo files")
+    options, args = optParser.parse_args()
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+    jobs = scenarios(options.net_file, parse_seeds(options.seeds), options.output_dir)
+
+    start = time.time()
+    results = asyncio.run(run_scenarios(jobs, options.flow_window))
+    elapsed = time.time() - start
+    steps = sum(s for s, avgWait in results)
+    report = ["asyncio, 1 process: {} runs, {:.1f} s, {:.0f} steps/s".format(len(jobs), elapsed, steps / elapsed)]
+
+    if options.baseline:
+        start = time.time()
+        pool = multiprocessing.Pool(options.jobs)
+        baseline = pool.map(run_process, [(scenario, options.flow_window) for scenario in jobs])
+        pool.close()
+        pool.join()
+        elapsed = time.time() - start
+        report.append("{} processes: {} runs, {:.1f} s, {:.0f} steps/s".format(
+            options.jobs, len(jobs), elapsed, sum(s for s, avgWait in baseline) / elapsed))
+        if [avgWait for s, avgWait in baseline] != [avgWait for s, avgWait in results]:
+            report.append("warning: the baseline results differ from the asyncio ones")
+    print("\n".join(report))
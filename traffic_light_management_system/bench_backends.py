@@ -0,0 +1,71 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import time
+import optparse
+
+# we need to import python modules from the $SUMO_HOME/tools directory
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+from sumolib import checkBinary  # noqa
+import runner  # noqa
+import sumo_backend  # noqa
+import driver  # noqa
+
+NETWORKS = ["data/cross2x3.net.xml", "data/cross2x3_turns.net.xml"]
+
+
+class StepCounter:
+    """Forwards everything to the backend and counts the simulation steps."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.steps = 0
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def simulationStep(self, *args):
+        self.steps += 1
+        return self.backend.simulationStep(*args)
+
+
+def bench(backendName, network, seed):
+    routeFile = "data/bench.rou.xml"
+    runner.generate_routeFile(network, routeFile, seed)
+    counter = StepCounter(sumo_backend.load(backendName))
+    counter.start([checkBinary('sumo'), "-c", "data/cross2x2.sumocfg", "-n", network, "-r", routeFile,
+                   "--no-step-log", "true", "--duration-log.disable", "true"])
+    # the driver only sees the counter, so exactly the same control loop is measured
+    start = time.time()
+    driver.run(runner.controller(), counter, network)
+    elapsed = time.time() - start
+    return counter.steps / elapsed
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--seed", type="int", default=42, help="seed for the generated demand")
+    optParser.add_option("--repeat", type="int", default=3, help="runs per backend and network")
+    options, args = optParser.parse_args()
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+
+    print("{:<32} {:>16} {:>16} {:>8}".format("network", "traci steps/s", "libsumo steps/s", "speedup"))
+    for network in NETWORKS:
+        # libsumo keeps one simulation per process, so the runs are strictly sequential
+        rates = {}
+        for backendName in sumo_backend.BACKENDS:
+            rates[backendName] = max(bench(backendName, network, options.seed) for _ in range(options.repeat))
+        print("{:<32} {:>16.1f} {:>16.1f} {:>7.2f}x".format(
+            os.path.basename(network), rates["traci"], rates["libsumo"], rates["libsumo"] / rates["traci"]))
@@ -0,0 +1,181 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import io
+import os
+import sys
+import json
+import time
+import optparse
+import contextlib
+import tracemalloc
+
+import numpy as np
+
+import topology
+import controllers
+import fake_traci
+import profiler
+import driver
+import runner
+import runner_fixed
+from plan_cache import PlanCache
+
+BENCH_CONTROLLERS = {
+    "webster": lambda topo: runner.controller(),
+    "webster-cached": lambda topo: runner.controller(planCache=PlanCache()),
+    "static": lambda topo: controllers.WebsterStatic([[[600, 600], [600, 600]]] * len(topo.approaches)),
+    "fixed": lambda topo: runner_fixed.controller(),
+}
+# a result regresses when it exceeds baseline * tolerance + slack; the latencies of a few
+# microseconds per step move by more than their own size with the load of the machine
+KPIS = {
+    "latency_mean_us": ("time", 5.),
+    "latency_p99_us": ("time", 25.),
+    "calls_per_step": ("calls", 0.),
+    "alloc_mean_kib": ("memory", .5),
+    "alloc_peak_kib": ("memory", 1.),
+}
+# fewer timed runs are too noisy to fail on, their latencies are only reported
+MIN_TIMED_REPEAT = 5
+
+
+class AllocationProbe:
+    """Forwards to a controller and measures with tracemalloc what each step() allocates at its peak."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.peaks = []
+
+    def start(self, tls, topo):
+        self.controller.start(tls, topo)
+
+    def step(self, snapshot):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        commands = self.controller.step(snapshot)
+        self.peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        return commands
+
+    def finish(self):
+        self.controller.finish()
+
+
+def simulate(controller, netFile, routeFile, trace, steps, prof=None):
+    conn = fake_traci.FakeTraci(trace)
+    conn.start(["sumo", "-n", netFile, "-r", routeFile])
+    # the driver reports the metrics of every run, only the measurements are of interest here
+    with contextlib.redirect_stdout(io.StringIO()):
+        driver.run(controller, conn, netFile, prof=prof, maxStep=steps)
+
+
+def bench(name, netFile, routeFile, trace=None, steps=driver.MAX_STEP, repeat=MIN_TIMED_REPEAT):
+    """Latency, TraCI calls and allocations of the control loop of controller name on the fake backend."""
+    topo = topology.load(netFile)
+    latencies = []
+    for _ in range(repeat):
+        prof = profiler.Profiler()
+        simulate(BENCH_CONTROLLERS[name](topo), netFile, routeFile, trace, steps, prof)
+        # the controller section covers step() and sending its commands
+        latencies.append(np.asarray(prof.sectionTimes["controller"]))
+    calls = dict((key, count) for key, (count, total) in prof.calls.items() if count)
+
+    probe = AllocationProbe(BENCH_CONTROLLERS[name](topo))
+    tracemalloc.start()
+    try:
+        simulate(probe, netFile, routeFile, trace, steps)
+    finally:
+        tracemalloc.stop()
+    peaks = np.asarray(probe.peaks) / 1024.
+    return {
+        # the fastest repetition is the least disturbed by the rest of the machine
+        "latency_mean_us": min(t.mean() for t in latencies) * 1e6,
+        "latency_p99_us": min(np.percentile(t, 99) for t in latencies) * 1e6,
+        "calls_per_step": sum(calls.values()) / float(prof.step),
+        "alloc_mean_kib": float(peaks.mean()),
+        "alloc_peak_kib": float(peaks.max()),
+        "calls": calls,
+    }
+
+
+def regressions(results, baseline, tolerances):
+    """KPIs of results over the limits of baseline, only for the kinds of KPI in tolerances."""
+    found = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for kpi, (kind, slack) in sorted(KPIS.items()):
+            if kind not in tolerances:
+                continue
+            limit = baseline[name][kpi] * tolerances[kind] + slack
+            if result[kpi] > limit:
+                found.append("{} {}: {:.3f} > {:.3f} (baseline {:.3f})".format(
+                    name, kpi, result[kpi], limit, baseline[name][kpi]))
+    return found
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("-n", "--net-file", default="data/cross2x3.net.xml", help="network to simulate")
+    optParser.add_option("--trace", metavar="DIR", help="play back the arrivals of a trace of runner.py --record")
+    optParser.add_option("--seed", type="int", default=42, help="seed for the generated demand")
+    optParser.add_option("--steps", type="int", default=driver.MAX_STEP, help="simulated seconds per run")
+    optParser.add_option("--repeat", type="int", default=MIN_TIMED_REPEAT,
+                         help="timed runs per controller, the fastest counts; latencies are only compared "
+                              "against the baseline from {} runs on, the default".format(MIN_TIMED_REPEAT))
+    optParser.add_option("--controllers", default=",".join(sorted(BENCH_CONTROLLERS)),
+                         help="comma separated subset of " + ",".join(sorted(BENCH_CONTROLLERS)))
+    optParser.add_option("--baseline", default="perf_baseline.json", help="results to compare against")
+    optParser.add_option("--update", action="store_true", default=False,
+                         help="save the results as the new baseline instead of comparing")
+    optParser.add_option("--history", default="perf_history.jsonl", help="every run's results are appended here")
+    optParser.add_option("--time-tolerance", type="float", default=1.5,
+                         help="allowed factor over the baseline latencies")
+    optParser.add_option("--memory-tolerance", type="float", default=1.2,
+                         help="allowed factor over the baseline allocations")
+    optParser.add_option("--call-tolerance", type="float", default=1.,
+                         help="allowed factor over the baseline TraCI calls per step")
+    options, args = optParser.parse_args()
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    routeFile = "data/bench.rou.xml"
+    if not options.trace:
+        runner.generate_routeFile(options.net_file, routeFile, options.seed)
+    settings = {"network": options.net_file, "trace": options.trace, "seed": options.seed, "steps": options.steps}
+
+    results = {}
+    print("{:<16} {:>12} {:>12} {:>12} {:>12} {:>12}".format(
+        "controller", "mean us", "p99 us", "calls/step", "alloc KiB", "peak KiB"))
+    for name in options.controllers.split(","):
+        results[name] = result = bench(name, options.net_file, routeFile, options.trace, options.steps,
+                                       options.repeat)
+        print("{:<16} {latency_mean_us:>12.2f} {latency_p99_us:>12.2f} {calls_per_step:>12.3f} "
+              "{alloc_mean_kib:>12.3f} {alloc_peak_kib:>12.3f}".format(name, **result))
+        sys.stdout.flush()
+
+    with open(options.history, "a") as history:
+        history.write(json.dumps(dict(settings, time=time.strftime("%Y-%m-%dT%H:%M:%S"), results=results)) + "\n")
+
+    if options.update or not os.path.exists(options.baseline):
+        with open(options.baseline, "w") as baseline:
+            json.dump(dict(settings, results=results), baseline, indent=1)
+        print("saved the baseline to", options.baseline)
+        sys.exit()
+
+    with open(options.baseline) as baseline:
+        baseline = json.load(baseline)
+    if any(baseline[key] != value for key, value in settings.items()):
+        sys.exit("{} was taken with other settings, rerun with --update".format(options.baseline))
+    tolerances = {"memory": options.memory_tolerance, "calls": options.call_tolerance}
+    if options.repeat >= MIN_TIMED_REPEAT:
+        tolerances["time"] = options.time_tolerance
+    else:
+        print("latencies are not compared with --repeat below", MIN_TIMED_REPEAT)
+    found = regressions(results, baseline["results"], tolerances)
+    if found:
+        sys.exit("performance regressions against {}:\n{}".format(options.baseline, "\n".join(found)))
+    print("no regressions against", options.baseline)
@@ -0,0 +1,116 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import time
+import optparse
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak memory is then not reported
+    resource = None
+
+# we need to import python modules from the $SUMO_HOME/tools directory
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+from sumolib import checkBinary  # noqa
+import sumo_backend  # noqa
+import controllers  # noqa
+import profiler  # noqa
+import demand  # noqa
+import driver  # noqa
+import gridnet  # noqa
+
+# WebsterStatic needs flows known in advance and only exists for the 2x2 demand of runner2.py
+BENCH_CONTROLLERS = ["webster", "fixed"]
+
+
+def parse_sizes(text):
+    return [tuple(int(n) for n in size.split("x")) for size in text.split(",")]
+
+
+def peak_memory():
+    """Peak resident memory in MB of this process and of its finished child processes."""
+    if resource is None:
+        return float("nan"), float("nan")
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1024. * 1024. if sys.platform == "darwin" else 1024.
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit)
+
+
+def bench(job):
+    network, controllerName, steps, backend = job
+    routeFile = network.replace(".net.xml", ".rou.xml")
+    conn = sumo_backend.load(backend)
+    conn.start([checkBinary('sumo'), "-c", "data/cross2x2.sumocfg", "-n", network, "-r", routeFile,
+                "--no-step-log", "true", "--duration-log.disable", "true", "--no-warnings", "true"])
+    lights = len(conn.trafficlight.getIDList())
+    prof = profiler.Profiler()
+    start = time.time()
+    driver.run(controllers.CONTROLLERS[controllerName](), conn, network, prof=prof, maxStep=steps)
+    elapsed = time.time() - start
+    selfMemory, childMemory = peak_memory()
+    controllerTime = sum(prof.sectionTimes["controller"])
+    return {
+        "network": os.path.basename(network),
+        "controller": controllerName,
+        "lights": lights,
+        "steps": prof.step,
+        "steps_per_s": prof.step / elapsed,
+        # with libsumo the simulation lives in this process, with traci in the sumo child
+        "memory": selfMemory + (childMemory if backend == "traci" else 0),
+        "controller_per_light": controllerTime / max(1, prof.step) / lights,
+        "observation_per_step": sum(prof.sectionTimes["observation"]) / max(1, prof.step),
+    }
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--sizes", default="2x2,5x5,10x10,20x20,50x50", help="comma separated grid sizes ROWSxCOLS")
+    optParser.add_option("--turns", action="store_true", default=False, help="also run the grids with turn lanes")
+    optParser.add_option("--controllers", default=",".join(BENCH_CONTROLLERS),
+                         help="comma separated subset of " + ",".join(BENCH_CONTROLLERS))
+    optParser.add_option("--steps", type="int", default=600, help="simulated seconds per run")
+    optParser.add_option("--seed", type="int", default=42, help="seed for the generated demand")
+    optParser.add_option("--output-dir", default="bench_grids", help="directory for the generated nets and routes")
+    sumo_backend.add_option(optParser)
+    optParser.set_defaults(backend="libsumo")
+    options, args = optParser.parse_args()
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+
+    print("{:<26} {:<10} {:>6} {:>10} {:>10} {:>16} {:>16}".format(
+        "network", "controller", "lights", "steps/s", "peak MB", "ctrl us/light", "obs ms/step"))
+    for rows, cols in parse_sizes(options.sizes):
+        for turns in ([False, True] if options.turns else [False]):
+            network = os.path.join(options.output_dir, "grid{}x{}{}.net.xml".format(rows, cols, "_turns" if turns else ""))
+            if not os.path.exists(network):
+                gridnet.build(network, rows, cols, turns)
+            # the hourly demand of runner.py, scaled down to the simulated period
+            scale = options.steps / 3600.
+            demand.generate(network, network.replace(".net.xml", ".rou.xml"), options.seed, end=options.steps,
+                            minNumber=int(250 * scale), maxNumber=int(925 * scale), turnShare=0.3 if turns else 0.)
+            for controllerName in options.controllers.split(","):
+                # a fresh process per run, so the peak memory belongs to this grid alone
+                pool = multiprocessing.Pool(1, maxtasksperchild=1)
+                result = pool.apply(bench, ((network, controllerName, options.steps, options.backend),))
+                pool.close()
+                pool.join()
+                print("{network:<26} {controller:<10} {lights:>6} {steps_per_s:>10.1f} {memory:>10.1f} "
+                      "{0:>16.2f} {1:>16.3f}".format(result["controller_per_light"] * 1e6,
+                                                     result["observation_per_step"] * 1e3, **result))
+                sys.stdout.flush()
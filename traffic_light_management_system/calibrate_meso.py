@@ -0,0 +1,133 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import csv
+import time
+import optparse
+import multiprocessing
+
+# we need to import python modules from the $SUMO_HOME/tools directory
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+from sumolib import checkBinary  # noqa
+import sumo_backend  # noqa
+import controllers  # noqa
+import tripinfo_store  # noqa
+import driver  # noqa
+import runner  # noqa
+from sweep import parse_seeds  # noqa
+
+NETWORKS = ["data/cross2x2.net.xml", "data/cross2x2_noturns.net.xml", "data/cross2x3.net.xml",
+            "data/cross2x3_turns.net.xml"]
+KPIS = ["avg_wait", "trip_duration", "trip_waiting", "time_loss", "wall_time"]
+COLUMNS = ["network", "controller", "seed", "model", "step_length"] + KPIS
+
+
+def run_job(job):
+    network, controllerName, seed, mesosim, stepLength, outDir, backend = job
+    name = "{}_{}_{}_{}{}".format(os.path.basename(network).split(".")[0], controllerName, seed,
+                                  "meso" if mesosim else "micro", stepLength)
+    routeFile = os.path.join(outDir, "{}_{}.rou.xml".format(os.path.basename(network).split(".")[0], seed))
+    tripinfo = os.path.join(outDir, name + ".tripinfo.xml")
+    conn = sumo_backend.load(backend)
+    conn.start([checkBinary('sumo'), "-c", "data/cross2x2.sumocfg", "-n", network, "-r", routeFile,
+                "--seed", str(seed), "--tripinfo-output", tripinfo, "--no-step-log", "true",
+                "--no-warnings", "true"] + driver.model_args(mesosim, stepLength))
+    start = time.time()
+    avgWait = driver.run(controllers.CONTROLLERS[controllerName](), conn, network, stepLength=stepLength)
+    wallTime = time.time() - start
+    trips = list(tripinfo_store.read_tripinfos(tripinfo))
+    count = max(1, len(trips))
+    return {
+        "network": network,
+        "controller": controllerName,
+        "seed": seed,
+        "model": "meso" if mesosim else "micro",
+        "step_length": stepLength,
+        "avg_wait": avgWait,
+        "trip_duration": sum(t[1] for t in trips) / count,
+        "trip_waiting": sum(t[2] for t in trips) / count,
+        "time_loss": sum(t[3] for t in trips) / count,
+        "wall_time": wallTime,
+    }
+
+
+def report(rows):
+    """Mean KPIs per network, controller and model, with the deviation of meso from micro."""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["network"], row["controller"], row["model"], row["step_length"]), []).append(row)
+    means = dict((key, dict((k, sum(r[k] for r in group) / len(group)) for k in KPIS))
+                 for key, group in groups.items())
+
+    lines = ["{:<32} {:<8} {:<10} {:>10} {:>10} {:>10} {:>10} {:>9}".format(
+        "network", "control", "model", "avg wait", "duration", "waiting", "time loss", "speedup")]
+    for key in sorted(means):
+        network, controllerName, model, stepLength = key
+        kpis = means[key]
+        micro = means.get((network, controllerName, "micro", 1.))
+        cells = []
+        for k in KPIS[:-1]:
+            if model == "meso" and micro:
+                cells.append("{:+9.1f}%".format(100. * (kpis[k] - micro[k]) / micro[k] if micro[k] else 0.))
+            else:
+                cells.append("{:10.2f}".format(kpis[k]))
+        speedup = micro["wall_time"] / kpis["wall_time"] if micro else float("nan")
+        lines.append("{:<32} {:<8} {:<10} {} {:>8.1f}x".format(
+            os.path.basename(network), controllerName, "{}{:g}s".format(model, stepLength), " ".join(cells), speedup))
+    return "\n".join(lines)
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--networks", default=",".join(NETWORKS), help="comma separated list of net files")
+    optParser.add_option("--controllers", default="webster,fixed", help="comma separated controllers to compare")
+    optParser.add_option("--seeds", default="1-3", help="seeds to run, e.g. 1-5 or 1,5,9")
+    optParser.add_option("--step-lengths", default="1,2", help="comma separated step lengths of the meso runs")
+    optParser.add_option("-j", "--jobs", type="int", default=multiprocessing.cpu_count(),
+                         help="number of parallel sumo instances")
+    optParser.add_option("--output-dir", default="calibration_output",
+                         help="directory for the per-run route and tripinfo files")
+    optParser.add_option("-o", "--output", default="meso_calibration.csv", help="table of all runs")
+    sumo_backend.add_option(optParser)
+    optParser.set_defaults(backend="libsumo")
+    options, args = optParser.parse_args()
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+
+    seeds = parse_seeds(options.seeds)
+    jobs = []
+    for network in options.networks.split(","):
+        for seed in seeds:
+            # micro and meso runs of a network and seed share one demand
+            runner.generate_routeFile(network, os.path.join(
+                options.output_dir, "{}_{}.rou.xml".format(os.path.basename(network).split(".")[0], seed)), seed)
+            for controllerName in options.controllers.split(","):
+                jobs.append((network, controllerName, seed, False, 1., options.output_dir, options.backend))
+                for stepLength in options.step_lengths.split(","):
+                    jobs.append((network, controllerName, seed, True, float(stepLength), options.output_dir,
+                                 options.backend))
+
+    pool = multiprocessing.Pool(options.jobs)
+    rows = pool.map(run_job, jobs)
+    pool.close()
+    pool.join()
+
+    with open(options.output, "w", newline="") as results:
+        writer = csv.DictWriter(results, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(report(rows))
+    print("meso columns give the deviation from the micro run, wrote", len(rows), "runs to", options.output)
@@ -0,0 +1,180 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import math
+import heapq
+
+import webster
+from spillback import Spillback
+from topology import DIRECTIONS
+
+# flow columns of the two phases: phase 0 serves north/south, phase 2 east/west
+NS_EW = [[DIRECTIONS.index("north"), DIRECTIONS.index("south")],
+         [DIRECTIONS.index("east"), DIRECTIONS.index("west")]]
+
+
+def program(GNS, GEW):
+    """Durations of the four phase program for the greens of a plan; the yellow phases are kept."""
+    return [math.ceil(GNS), None, math.ceil(GEW), None]
+
+
+def finish_cache(planCache):
+    if planCache is not None:
+        planCache.save()
+        print(planCache.report())
+
+
+class Controller:
+    """Signal control policy driven by driver.run().
+
+    start() is called once with the light IDs and the network topology,
+    step() once per simulation step with an observation.Snapshot. step()
+    returns a list of (tl, phase, duration) commands; duration may be None
+    to only switch the phase, or a list with a duration (or None to keep it)
+    per phase of the program to install as the light's new program, starting
+    in phase. finish() is called once after the last step.
+    """
+
+    name = None
+
+    def start(self, tls, topo):
+        self.tls = list(tls)
+        self.topo = topo
+
+    def step(self, snapshot):
+        return []
+
+    def finish(self):
+        pass
+
+
+class FixedTime(Controller):
+    """Leaves the programs of the net file running unchanged."""
+
+    name = "fixed"
+
+
+class WebsterStatic(Controller):
+    """Sets one Webster plan from known flows in the first step.
+
+    With a plan_cache.PlanCache the plan is taken from the cache and
+    installed as the program of the light.
+    """
+
+    name = "static"
+
+    def __init__(self, flows, lostTime=4, saturationFlow=1850, minRatio=0.01, planCache=None):
+        # flows[light] = [[north, south], [east, west]], by light index or by light ID
+        self.flows = flows
+        self.lostTime = lostTime
+        self.saturationFlow = saturationFlow
+        self.minRatio = minRatio
+        self.planCache = planCache
+
+    def start(self, tls, topo):
+        Controller.start(self, tls, topo)
+        if isinstance(self.flows, dict):
+            self.flows = [self.flows[tl] for tl in self.tls]
+        if len(self.flows) != len(self.tls):
+            raise ValueError("static flows are given for {} lights, the network has {}".format(
+                len(self.flows), len(self.tls)))
+
+    def step(self, snapshot):
+        if snapshot.step != 1:
+            return []
+        if self.planCache is not None:
+            cycles, greens, keys = self.planCache.lookup(self.flows, self.saturationFlow, self.lostTime,
+                                                         minRatio=self.minRatio)
+            return [(tl, 0, program(GNS, GEW)) for tl, (GNS, GEW) in zip(self.tls, greens)]
+        cycles, greens = webster.timings(self.flows, self.saturationFlow, self.lostTime, minRatio=self.minRatio)
+        commands = []
+        for tl, (GNS, GEW) in zip(self.tls, greens):
+            commands.append((tl, 2, GEW))
+            commands.append((tl, 0, GNS))
+        return commands
+
+    def finish(self):
+        finish_cache(self.planCache)
+
+
+class WebsterAdaptive(Controller):
+    """Recomputes the Webster plan of every light at the end of its cycle from counted flows.
+
+    The next decision time of every light is kept in a heap, so a step in
+    which no light is due costs one comparison and a decision only touches
+    the lights that are due.
+
+    With a plan_cache.PlanCache the plans come from the cache and are
+    installed as the programs of the lights. A light keeps running its
+    program as long as its demand stays in the same bucket, so only lights
+    whose bucket changed are sent commands.
+
+    A light that spillback.Spillback flags under spillbackPolicy starts its
+    next cycle in the phase of the override.
+    """
+
+    name = "webster"
+
+    def __init__(self, lostTime=8, saturationFlow=1850, maxCycle=42, firstCycle=42, occupancyThreshold=0.9,
+                 planCache=None, spillbackPolicy="approach"):
+        self.lostTime = lostTime
+        self.saturationFlow = saturationFlow
+        self.maxCycle = maxCycle
+        self.firstCycle = firstCycle
+        self.occupancyThreshold = occupancyThreshold
+        self.planCache = planCache
+        self.spillbackPolicy = spillbackPolicy
+
+    def start(self, tls, topo):
+        Controller.start(self, tls, topo)
+        # the bucket of the program each light runs, see planCache
+        self.buckets = {}
+        self.spillback = Spillback(topo, self.tls, self.occupancyThreshold, self.spillbackPolicy)
+        self.schedule = [(self.firstCycle, tl) for tl in range(len(self.tls))]
+        heapq.heapify(self.schedule)
+
+    def step(self, snapshot):
+        now = snapshot.time
+        if not self.schedule or self.schedule[0][0] > now:
+            return []
+        due = []
+        while self.schedule and self.schedule[0][0] <= now:
+            due.append(heapq.heappop(self.schedule)[1])
+
+        flows = snapshot.flows(due)[:, NS_EW]
+        if self.planCache is not None:
+            cycles, greens, keys = self.planCache.lookup(flows, self.saturationFlow, self.lostTime, self.maxCycle)
+        else:
+            cycles, greens = webster.timings(flows, self.saturationFlow, self.lostTime, maxCycle=self.maxCycle)
+        overrides = self.spillback.overrides(snapshot)
+
+        commands = []
+        for i, tl in enumerate(due):
+            GNS, GEW = greens[i]
+            heapq.heappush(self.schedule, (now + math.ceil(cycles[i]), tl))
+            phase = overrides.get(tl, 0)
+            if self.planCache is not None:
+                if self.buckets.get(tl) != keys[i]:
+                    self.buckets[tl] = keys[i]
+                    commands.append((self.tls[tl], phase, program(GNS, GEW)))
+                elif tl in overrides:
+                    commands.append((self.tls[tl], phase, None))
+                continue
+            # the phase set last runs first
+            if phase == 2:
+                commands.append((self.tls[tl], 0, math.ceil(GNS)))
+                commands.append((self.tls[tl], 2, math.ceil(GEW)))
+            else:
+                commands.append((self.tls[tl], 2, math.ceil(GEW)))
+                commands.append((self.tls[tl], 0, math.ceil(GNS)))
+        return commands
+
+    def finish(self):
+        finish_cache(self.planCache)
+
+
+CONTROLLERS = {
+    "webster": WebsterAdaptive,
+    "static": WebsterStatic,
+    "fixed": FixedTime,
+}
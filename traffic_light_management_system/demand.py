@@ -0,0 +1,178 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import math
+import random
+import optparse
+import xml.etree.ElementTree as ET
+
+import topology
+
+PROFILES = ("constant", "ramp", "peak")
+
+
+def profile_weights(profile, begin, end, interval, factor=3., peakTime=None, peakWidth=None):
+    """Relative demand of every interval in [begin, end).
+
+    constant keeps the demand flat, ramp raises it linearly to factor times
+    the starting level and peak adds a Gaussian bump that reaches factor
+    times the base level at peakTime.
+    """
+    if profile not in PROFILES:
+        raise ValueError("unknown profile '{}', expected one of {}".format(profile, ", ".join(PROFILES)))
+    if peakTime is None:
+        peakTime = (begin + end) / 2.
+    if peakWidth is None:
+        peakWidth = (end - begin) / 6.
+    weights = []
+    for start in range(begin, end, interval):
+        mid = (start + min(start + interval, end)) / 2.
+        if profile == "ramp":
+            weights.append(1 + (factor - 1) * (mid - begin) / (end - begin))
+        elif profile == "peak":
+            weights.append(1 + (factor - 1) * math.exp(-0.5 * ((mid - peakTime) / peakWidth) ** 2))
+        else:
+            weights.append(1.)
+        weights[-1] *= min(start + interval, end) - start
+    total = sum(weights)
+    return [w / total for w in weights]
+
+
+def write_routes(routes, rows, cols, rng, begin=0, end=3600, minNumber=250, maxNumber=925,
+                 profile="constant", interval=None, factor=3., peakTime=None, peakWidth=None, turnShare=0.):
+    """Write the route file for a rows x cols grid using the w{i}i/e{i}o/... edge naming."""
+    if interval is None or profile == "constant":
+        interval = end - begin
+    weights = profile_weights(profile, begin, end, interval, factor, peakTime, peakWidth)
+    matrix = [[c + r * cols + 1 for c in range(cols)] for r in range(rows)]
+
+    out = []
+    out.append("<routes>\n")
+    for r in range(rows):
+        out.append('<route id="right{}" edges="{} e{}o" />\n'.format(
+            r + 1, " ".join("w{}i".format(i) for i in matrix[r]), matrix[r][-1]))
+    for r in range(rows):
+        out.append('<route id="left{}" edges="{} w{}o" />\n'.format(
+            r + 1, " ".join("e{}i".format(i) for i in reversed(matrix[r])), matrix[r][0]))
+    for c in range(cols):
+        out.append('<route id="down{}" edges="{} s{}o" />\n'.format(
+            c + 1, " ".join("n{}i".format(matrix[r][c]) for r in range(rows)), matrix[-1][c]))
+    for c in range(cols):
+        out.append('<route id="up{}" edges="{} n{}o" />\n'.format(
+            c + 1, " ".join("s{}i".format(matrix[r][c]) for r in reversed(range(rows))), matrix[0][c]))
+    routes.write("".join(out))
+
+    # (id, from, to, left turn exits, right turn exits); the draws keep the
+    # order of the original generator so old seeds give the same demand
+    entries = []
+    for r in range(rows):
+        entries.append(("WE{}".format(r + 1), "w{}i".format(matrix[r][0]), "e{}o".format(matrix[r][-1]),
+                        ["n{}o".format(i) for i in matrix[0]], ["s{}o".format(i) for i in matrix[-1]]))
+        entries.append(("EW{}".format(r + 1), "e{}i".format(matrix[r][-1]), "w{}o".format(matrix[r][0]),
+                        ["s{}o".format(i) for i in matrix[-1]], ["n{}o".format(i) for i in matrix[0]]))
+    for c in range(cols):
+        entries.append(("NS{}".format(c + 1), "n{}i".format(matrix[0][c]), "s{}o".format(matrix[-1][c]),
+                        ["e{}o".format(row[-1]) for row in matrix], ["w{}o".format(row[0]) for row in matrix]))
+        entries.append(("SN{}".format(c + 1), "s{}i".format(matrix[-1][c]), "n{}o".format(matrix[0][c]),
+                        ["w{}o".format(row[0]) for row in matrix], ["e{}o".format(row[-1]) for row in matrix]))
+
+    drawn = []
+    for _ in entries:
+        number = rng.randint(minNumber, maxNumber)
+        drawn.append((number, "{},{},{}".format(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255))))
+    flows = []
+    for (flowId, source, sink, left, right), (number, color) in zip(entries, drawn):
+        flows.append((flowId, source, sink, number * (1 - turnShare), color))
+    if turnShare > 0:
+        for (flowId, source, sink, left, right), (number, color) in zip(entries, drawn):
+            flows.append((flowId + "L", source, rng.choice(left), number * turnShare / 2, color))
+            flows.append((flowId + "R", source, rng.choice(right), number * turnShare / 2, color))
+
+    out = []
+    for k, start in enumerate(range(begin, end, interval)):
+        stop = min(start + interval, end)
+        suffix = "" if len(weights) == 1 else "_{}".format(k)
+        for flowId, source, sink, number, color in flows:
+            count = int(round(number * weights[k]))
+            if count > 0:
+                out.append('<flow id="{}{}" begin="{}" end="{}" number="{}" from="{}" to="{}" color="{}" />\n'.format(
+                    flowId, suffix, start, stop, count, source, sink, color))
+        if len(out) > 4096:
+            routes.write("".join(out))
+            out = []
+    out.append("</routes>\n")
+    routes.write("".join(out))
+
+
+def generate(netFile, routeFile, seed=None, **kwargs):
+    """Write the demand for the grid in netFile to routeFile; see write_routes for the options."""
+    topo = topology.load(netFile)
+    with open(routeFile, "w", buffering=1 << 20) as routes:
+        write_routes(routes, topo.rows, topo.cols, random.Random(seed), **kwargs)
+
+
+def approach_flows(netFile, routeFile):
+    """Mean flows (veh/h) of the demand in routeFile on the approaches of every light of netFile.
+
+    Returns a dict of light ID to [[north, south], [east, west]], the flows
+    controllers.WebsterStatic takes. Flows without a route are routed over
+    the fewest edges, like fake_traci does.
+    """
+    topo = topology.load(netFile)
+    routes = {}
+    counts = {}
+    spans = []
+    for event, elem in ET.iterparse(routeFile):
+        if elem.tag == "route" and elem.get("id"):
+            routes[elem.get("id")] = elem.get("edges").split()
+        elif elem.tag == "flow":
+            if elem.get("route"):
+                edges = routes[elem.get("route")]
+            else:
+                edges = topo.route(elem.get("from"), elem.get("to"))
+            for edge in edges:
+                counts[edge] = counts.get(edge, 0) + int(elem.get("number"))
+            spans.append((float(elem.get("begin")), float(elem.get("end"))))
+    hours = (max(e for b, e in spans) - min(b for b, e in spans)) / 3600. if spans else 1.
+    flows = {}
+    for tl, approaches in topo.approaches.items():
+        rates = dict((d, sum(counts.get(e, 0) for e in approaches[d]) / hours) for d in topology.DIRECTIONS)
+        flows[tl] = [[rates["north"], rates["south"]], [rates["east"], rates["west"]]]
+    return flows
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("-n", "--net-file", default="data/cross2x3.net.xml", help="grid network to create demand for")
+    optParser.add_option("--rows", type="int", help="grid rows, skips reading the net file (needs --cols)")
+    optParser.add_option("--cols", type="int", help="grid columns, skips reading the net file (needs --rows)")
+    optParser.add_option("-o", "--output", default="data/cross.rou.xml", help="route file to write")
+    optParser.add_option("-s", "--seed", type="int", help="random seed, equal seeds give equal demand")
+    optParser.add_option("-b", "--begin", type="int", default=0)
+    optParser.add_option("-e", "--end", type="int", default=3600)
+    optParser.add_option("--min-number", type="int", default=250, help="fewest vehicles per entry flow")
+    optParser.add_option("--max-number", type="int", default=925, help="most vehicles per entry flow")
+    optParser.add_option("--profile", choices=PROFILES, default="constant", help="shape of the demand over time")
+    optParser.add_option("--interval", type="int", default=300, help="length of the time slices of a profile")
+    optParser.add_option("--factor", type="float", default=3.,
+                         help="demand at the end of a ramp or the top of a peak relative to the base")
+    optParser.add_option("--peak-time", type="float", help="time of the peak, defaults to the middle")
+    optParser.add_option("--peak-width", type="float", help="standard deviation of the peak in seconds")
+    optParser.add_option("--turn-share", type="float", default=0.,
+                         help="share of every entry flow that turns left or right (needs turn lanes)")
+    options, args = optParser.parse_args()
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    kwargs = dict(begin=options.begin, end=options.end, minNumber=options.min_number,
+                  maxNumber=options.max_number, profile=options.profile, interval=options.interval,
+                  factor=options.factor, peakTime=options.peak_time, peakWidth=options.peak_width,
+                  turnShare=options.turn_share)
+    if options.rows and options.cols:
+        with open(options.output, "w", buffering=1 << 20) as routes:
+            write_routes(routes, options.rows, options.cols, random.Random(options.seed), **kwargs)
+    else:
+        generate(options.net_file, options.output, options.seed, **kwargs)
@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import optparse
+import xml.etree.ElementTree as ET
+
+import topology
+
+KINDS = {"e1": "inductionLoop", "e2": "laneAreaDetector"}
+# longer than any run, so the interval vehicle number counts every vehicle since the start
+PERIOD = 1000000
+
+
+def write_additional(topo, additionalFile, kind="e1", position=10.):
+    """Write a detector on every lane of every signalized approach of topo.
+
+    e1 places an induction loop position meters after the start of the lane,
+    e2 a lane area detector over the whole lane. Detector IDs are
+    {kind}_{tl}_{direction}_{lane}.
+    """
+    out = ['<additional>\n']
+    for tl in sorted(topo.approachLanes):
+        for d in topology.DIRECTIONS:
+            for lane in topo.approachLanes[tl][d]:
+                length = topo.laneLengths[lane]
+                detId = "{}_{}_{}_{}".format(kind, tl, d, lane)
+                if kind == "e1":
+                    out.append('    <inductionLoop id="{}" lane="{}" pos="{:.2f}" period="{}" file="NUL"/>\n'.format(
+                        detId, lane, min(position, length - 0.1), PERIOD))
+                else:
+                    out.append('    <laneAreaDetector id="{}" lane="{}" pos="0" length="{:.2f}" period="{}" '
+                               'file="NUL"/>\n'.format(detId, lane, length, PERIOD))
+    out.append('</additional>\n')
+    with open(additionalFile, "w") as additional:
+        additional.write("".join(out))
+
+
+def write_config(configFile, netFile, routeFile, additionalFile):
+    """Write a sumocfg that loads the network, the demand and the detectors."""
+    base = os.path.dirname(os.path.abspath(configFile))
+    with open(configFile, "w") as config:
+        config.write("""<?xml version="1.0" encoding="UTF-8"?>
+
+<configuration xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/sumoConfiguration.xsd">
+
+    <input>
+        <net-file value="{}"/>
+        <route-files value="{}"/>
+        <additional-files value="{}"/>
+    </input>
+
+    <time>
+        <begin value="0"/>
+    </time>
+
+    <report>
+        <verbose value="true"/>
+        <no-step-log value="true"/>
+    </report>
+
+</configuration>
+""".format(*[os.path.relpath(os.path.abspath(f), base) for f in (netFile, routeFile, additionalFile)]))
+
+
+def read(additionalFile):
+    """Return [(kind, id, lane)] of the detectors in an additional file."""
+    tags = dict((tag, kind) for kind, tag in KINDS.items())
+    return [(tags[elem.tag], elem.get("id"), elem.get("lane"))
+            for elem in ET.parse(additionalFile).getroot() if elem.tag in tags]
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("-n", "--net-file", default="data/cross2x3.net.xml", help="network to place detectors on")
+    optParser.add_option("-k", "--kind", choices=sorted(KINDS), default="e1",
+                         help="e1 (induction loops) or e2 (lane area detectors)")
+    optParser.add_option("-o", "--output", help="additional file to write, defaults to NET.det.xml")
+    optParser.add_option("--position", type="float", default=10.,
+                         help="distance of the induction loops from the start of their lane")
+    optParser.add_option("-c", "--config", help="also write a sumocfg loading the net, routes and detectors")
+    optParser.add_option("-r", "--route-file", default="data/cross.rou.xml", help="route file of the sumocfg")
+    options, args = optParser.parse_args()
+    if options.output is None:
+        options.output = options.net_file.replace(".net.xml", ".det.xml")
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    write_additional(topology.load(options.net_file), options.output, options.kind, options.position)
+    if options.config:
+        write_config(options.config, options.net_file, options.route_file, options.output)
@@ -0,0 +1,267 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import sys
+import math
+import optparse
+
+try:
+    from sumolib import checkBinary
+except ImportError:
+    # without sumo only fake_traci can be started, it ignores the binary
+    def checkBinary(name):
+        return name
+
+import profiler
+import topology
+import recording
+import warmstart
+import detectors
+import spillback
+import sumo_backend
+from observation import Observer, Snapshot
+from metrics import Metrics
+from flow_counter import FlowCounter, DetectorCounter
+from plan_cache import PlanCache
+
+MAX_STEP = 3600
+# sumo's mesoscopic model; junction control keeps the traffic lights effective
+MESO_ARGS = ["--mesosim", "true", "--meso-junction-control", "true"]
+
+
+def issue(conn, commands, prof):
+    """Send a batch of (tl, phase, duration) commands.
+
+    A bare phase switch that is followed by another command for the same
+    light in the batch would be overridden right away and is not sent. A
+    list of durations replaces the durations of the light's current program.
+    """
+    last = {}
+    for i, (tl, phase, duration) in enumerate(commands):
+        last[tl] = i
+    for i, (tl, phase, duration) in enumerate(commands):
+        if duration is None and last[tl] != i:
+            continue
+        with prof.light(tl):
+            if isinstance(duration, (list, tuple)):
+                logic = conn.trafficlight.getAllProgramLogics(tl)[0]
+                for p, d in zip(logic.phases, duration):
+                    if d is not None:
+                        p.duration = p.minDur = p.maxDur = d
+                logic.currentPhaseIndex = phase
+                conn.trafficlight.setProgramLogic(tl, logic)
+                conn.trafficlight.setPhase(tl, phase)
+                continue
+            conn.trafficlight.setPhase(tl, phase)
+            if duration is not None:
+                conn.trafficlight.setPhaseDuration(tl, duration)
+
+
+def run(controller, conn, netFile="data/cross2x3.net.xml", flowWindow=300, flowDecay=None, prof=None,
+        maxStep=MAX_STEP, record=None, monitor=None, detectorFile=None, verifyMetrics=False, lights=None,
+        stepLength=1., networkMetrics=True):
+    """Drive one simulation with controller and return the average waiting time of the vehicles.
+
+    With record set to a directory the observations of every step are saved
+    there as a trace for replay.py. monitor, when given, is called after every
+    step with the step and the average waiting time so far; the run stops
+    early once it returns True. With detectorFile, the additional file of
+    detectors.py loaded into the simulation, flows are read from its
+    detectors instead of the vehicle IDs on the approaches. verifyMetrics
+    also polls every vehicle's waiting time and exits when the edge based
+    metrics disagree with it. lights restricts the controller to a subset of
+    the traffic lights, the metrics still cover the whole network. Without
+    networkMetrics only the approaches and exits of the lights are observed,
+    no metrics are kept and None is returned.
+
+    maxStep and flowWindow are in simulated seconds; stepLength must be the
+    step length the simulation was started with.
+    """
+    if record and stepLength != 1:
+        raise ValueError("traces are recorded in steps of one second")
+    if not networkMetrics and (monitor or verifyMetrics):
+        raise ValueError("monitor and verifyMetrics need the network metrics")
+    if prof is None:
+        prof = profiler.NullProfiler()
+    prof.instrument(conn)
+    tls = conn.trafficlight.getIDList()
+    if lights is not None:
+        lights = set(lights)
+        tls = [tl for tl in tls if tl in lights]
+    topo = topology.load(netFile)
+    if networkMetrics:
+        edges = set(conn.edge.getIDList())
+    else:
+        # the controllers only look at the edges of their own lights
+        edges = set(e for tl in tls for approach in topo.approaches[tl].values() for e in approach)
+        edges.update(e for tl in tls for e in topo.exits[tl])
+
+    # approach d of light tl is counted at len(DIRECTIONS) * tl + d
+    approaches = [topo.approaches[tl][d] for tl in tls for d in topology.DIRECTIONS]
+    if detectorFile:
+        if record or flowDecay:
+            raise ValueError("detector counts support neither recording nor a decaying flow estimate")
+        domains = {"e1": conn.inductionloop, "e2": conn.lanearea}
+        index = dict((e, i) for i, approach in enumerate(approaches) for e in approach)
+        approachDetectors = [[] for _ in approaches]
+        for kind, det, lane in detectors.read(detectorFile):
+            if topo.lanes[lane] in index:
+                approachDetectors[index[topo.lanes[lane]]].append((domains[kind], det))
+        obs = Observer(conn, edges, vehicleWaiting=verifyMetrics)
+        counter = DetectorCounter(approachDetectors, flowWindow, stepLength)
+    else:
+        obs = Observer(conn, edges, [e for approach in approaches for e in approach], tls if record else (),
+                       verifyMetrics)
+        counter = FlowCounter(len(approaches), flowWindow, flowDecay, stepLength)
+    snapshot = Snapshot(obs, counter, tls, topology.DIRECTIONS, stepLength)
+    controller.start(tls, topo)
+    # maxStep may be a float (--end), the steps are counted in whole steps of stepLength
+    maxSteps = int(math.ceil(maxStep / stepLength - 1e-9))
+    recorder = None
+    if record:
+        recorder = recording.TraceRecorder(record, tls, topology.DIRECTIONS, approaches, maxSteps + 1)
+
+    metrics = Metrics(obs, verifyMetrics) if networkMetrics else None
+    step = 0
+
+    while obs.minExpectedNumber() > 0 and step <= maxSteps:
+        step += 1
+        snapshot.advance(step)
+        with prof.section("controller"):
+            commands = controller.step(snapshot)
+            if commands:
+                issue(conn, commands, prof)
+
+        with prof.section("observation"):
+            if detectorFile:
+                counter.update()
+            else:
+                vehicles = [[veh for e in approach for veh in obs.edgeVehicles(e)] for approach in approaches]
+                counter.update(vehicles)
+                counter.release(obs.arrivedVehicles())
+            if recorder is not None:
+                recorder.record(counter.arrivals, [len(v) for v in vehicles],
+                                [sum(obs.edgeOccupancy(e) for e in a) / max(1, len(a)) for a in approaches],
+                                [obs.phase(tl) for tl in tls])
+            if metrics is not None:
+                metrics.update()
+        if monitor is not None and monitor(step, metrics.sumWait / max(1, metrics.vehicleSteps)):
+            break
+
+        with prof.section("simulation"):
+            conn.simulationStep()
+        with prof.section("observation"):
+            obs.update()
+        prof.endStep()
+
+    controller.finish()
+    if metrics is not None:
+        print("The average total waiting time of vehicles:", metrics.averageWaitingTime())
+        print(metrics.report())
+    conn.close()
+    prof.restore()
+    if recorder is not None:
+        recorder.close()
+    sys.stdout.flush()
+    if metrics is None:
+        return None
+    metrics.check()
+    return metrics.averageWaitingTime()
+
+
+def get_options(netFile="data/cross2x3.net.xml"):
+    optParser = optparse.OptionParser()
+    optParser.add_option("--nogui", action="store_true",
+                         default=False, help="run the commandline version of sumo")
+    optParser.add_option("--waiting-time-memory", default=MAX_STEP)
+    optParser.add_option("-s", "--seed", type="int", help="seed for the generated demand, skips the prompt")
+    optParser.add_option("-n", "--net-file", default=netFile, help="network to simulate")
+    optParser.add_option("--flow-window", type="int", default=300,
+                         help="number of seconds the flow estimate is averaged over")
+    optParser.add_option("--flow-decay", type="float",
+                         help="use an exponentially decaying flow estimate that keeps this share per second")
+    optParser.add_option("--profile", metavar="FILE",
+                         help="time every TraCI call and step section and write the report to FILE (JSON)")
+    optParser.add_option("--step-budget", type="float", metavar="MS",
+                         help="with --profile, fail when a step takes longer than MS milliseconds")
+    optParser.add_option("--record", metavar="DIR", help="save the observations of every step as a trace in DIR")
+    optParser.add_option("--warmup", type="int", default=0, metavar="SECONDS",
+                         help="start from the state after SECONDS of the demand, saved once per network and demand")
+    optParser.add_option("--state-cache", help="directory of the saved warm-up states")
+    optParser.add_option("--verify-metrics", action="store_true", default=False,
+                         help="also sum every vehicle's waiting time and fail when the edge totals differ")
+    optParser.add_option("--detectors", metavar="FILE",
+                         help="load the detectors of FILE (see detectors.py) and count flows with them")
+    optParser.add_option("--mesosim", action="store_true", default=False,
+                         help="run sumo's mesoscopic model instead of the microscopic one")
+    optParser.add_option("--step-length", type="float", default=1., help="simulated seconds per step")
+    optParser.add_option("--end", type="float", default=MAX_STEP, help="simulated seconds after which the run stops")
+    optParser.add_option("--spillback", choices=spillback.POLICIES, default="approach",
+                         help="which congested edges of a light override its next phase: its approaches, "
+                              "its exits, both or none")
+    optParser.add_option("--plan-cache", metavar="FILE",
+                         help="reuse the Webster plans of quantized demands, kept in FILE across runs")
+    optParser.add_option("--plan-bucket", type="float", default=0.02,
+                         help="width of the flow ratio buckets of the plan cache")
+    sumo_backend.add_option(optParser)
+    options, args = optParser.parse_args()
+    sumo_backend.check_options(optParser, options)
+    return options
+
+
+def plan_cache(options):
+    """The plan_cache.PlanCache selected on the command line, or None."""
+    if not options.plan_cache:
+        return None
+    return PlanCache(options.plan_bucket, path=options.plan_cache)
+
+
+def model_args(mesosim=False, stepLength=1.):
+    """Options that select the traffic model and step length of sumo."""
+    args = ["--step-length", str(stepLength)]
+    if mesosim:
+        args += MESO_ARGS
+    return args
+
+
+def start(options, routeFile="data/cross.rou.xml"):
+    """Start sumo for a runner's command line options and return the connected backend."""
+    # this script has been called from the command line. It will start sumo as a
+    # server, then connect and run
+    if options.nogui:
+        sumoBinary = checkBinary('sumo')
+    else:
+        sumoBinary = checkBinary('sumo-gui')
+    conn = sumo_backend.load(options.backend, gui=not options.nogui)
+
+    # this is the normal way of using traci. sumo is started as a
+    # subprocess and then the python script connects and runs
+    sumoCmd = [sumoBinary, "-c", "data/cross2x2.sumocfg", "-n", options.net_file, "-r", routeFile,
+               "--tripinfo-output", "tripinfo.xml"]
+    modelArgs = model_args(options.mesosim, options.step_length)
+    sumoCmd += modelArgs
+    if options.detectors:
+        sumoCmd += ["-a", options.detectors]
+    if options.warmup:
+        sumoCmd += ["--save-state.rng", "true"]
+    conn.start(sumoCmd)
+    if options.warmup:
+        warmstart.restore(conn, sumoCmd, options.net_file, routeFile, options.warmup, options.state_cache,
+                          modelArgs)
+    return conn
+
+
+def main(controller, options, conn):
+    """Run controller with the profiling options of the command line."""
+    prof = None
+    if options.profile:
+        prof = profiler.Profiler(options.step_budget / 1e3 if options.step_budget else None)
+    avgWait = run(controller, conn, options.net_file, options.flow_window, options.flow_decay, prof,
+                  options.end, options.record, detectorFile=options.detectors, verifyMetrics=options.verify_metrics,
+                  stepLength=options.step_length)
+    if prof is not None:
+        prof.export(options.profile)
+        print(prof.summary())
+        if prof.overBudget():
+            sys.exit("{} steps exceeded the step budget".format(prof.overBudget()))
+    return avgWait
@@ -0,0 +1,393 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import copy
+import collections
+import xml.etree.ElementTree as ET
+
+import topology
+import recording
+
+
+class constants:
+    """The TraCI constants used by observation.py, for running without sumo."""
+
+    LAST_STEP_VEHICLE_NUMBER = 0x10
+    LAST_STEP_VEHICLE_ID_LIST = 0x12
+    LAST_STEP_OCCUPANCY = 0x13
+    LAST_STEP_VEHICLE_HALTING_NUMBER = 0x14
+    TL_CURRENT_PHASE = 0x28
+    VAR_DEPARTED_VEHICLES_IDS = 0x74
+    VAR_WAITING_TIME = 0x7a
+    VAR_ARRIVED_VEHICLES_IDS = 0x7a
+    VAR_MIN_EXPECTED_VEHICLES = 0x7d
+
+
+tc = constants
+
+
+class Phase:
+    def __init__(self, duration, state="", minDur=None, maxDur=None):
+        self.duration = duration
+        self.state = state
+        self.minDur = duration if minDur is None else minDur
+        self.maxDur = duration if maxDur is None else maxDur
+
+
+class Logic:
+    def __init__(self, programID, type, currentPhaseIndex, phases):
+        self.programID = programID
+        self.type = type
+        self.currentPhaseIndex = currentPhaseIndex
+        self.phases = phases
+
+    def getPhases(self):
+        return self.phases
+
+
+class Domain:
+    """Subscriptions of one TraCI domain; values are computed when they are read.
+
+    Only the TraCI functions are public, so profiler.Profiler counts the
+    calls of the driver and not those between the fake's own parts.
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.subscriptions = {}
+
+    def subscribe(self, objectID, varIDs=()):
+        self.subscriptions[objectID] = list(varIDs)
+
+    def getSubscriptionResults(self, objectID):
+        return dict((var, self._value(objectID, var)) for var in self.subscriptions.get(objectID, ()))
+
+    def getAllSubscriptionResults(self):
+        return dict((objectID, dict((var, self._value(objectID, var)) for var in varIDs))
+                    for objectID, varIDs in self.subscriptions.items())
+
+
+class EdgeDomain(Domain):
+
+    def getIDList(self):
+        return list(self.sim.edges)
+
+    def _value(self, edge, var):
+        if var == tc.LAST_STEP_VEHICLE_NUMBER:
+            return len(self.sim.queues[edge])
+        if var == tc.LAST_STEP_VEHICLE_ID_LIST:
+            return list(self.sim.queues[edge])
+        if var == tc.LAST_STEP_OCCUPANCY:
+            return self._occupancy(edge)
+        if var == tc.LAST_STEP_VEHICLE_HALTING_NUMBER:
+            return len(self.sim._halting(edge))
+        if var == tc.VAR_WAITING_TIME:
+            return self._waiting(edge)
+        raise ValueError("edge variable {:#x} is not supported".format(var))
+
+    def _occupancy(self, edge):
+        sim = self.sim
+        return min(1., len(sim.queues[edge]) * sim.vehicleLength / sim.capacity[edge])
+
+    def _waiting(self, edge):
+        now = self.sim.time
+        return sum(now - ready for ready in self.sim._halting(edge))
+
+    def getLastStepVehicleNumber(self, edge):
+        return len(self.sim.queues[edge])
+
+    def getLastStepVehicleIDs(self, edge):
+        return list(self.sim.queues[edge])
+
+    def getLastStepHaltingNumber(self, edge):
+        return len(self.sim._halting(edge))
+
+    def getLastStepOccupancy(self, edge):
+        return self._occupancy(edge)
+
+    def getWaitingTime(self, edge):
+        return self._waiting(edge)
+
+
+class LaneDomain(Domain):
+
+    def getIDList(self):
+        return [lane for edge in self.sim.edges for lane in self.sim.topo.edges[edge][2]]
+
+    def getEdgeID(self, lane):
+        return self.sim.topo.lanes[lane]
+
+    def getLength(self, lane):
+        return self.sim.topo.laneLengths[lane]
+
+
+class TrafficLightDomain(Domain):
+
+    def getIDList(self):
+        return list(self.sim.programs)
+
+    def _value(self, tl, var):
+        if var == tc.TL_CURRENT_PHASE:
+            return self.sim.phase[tl]
+        raise ValueError("traffic light variable {:#x} is not supported".format(var))
+
+    def getPhase(self, tl):
+        return self.sim.phase[tl]
+
+    def setPhase(self, tl, index):
+        self.sim.phase[tl] = index
+        self.sim.remaining[tl] = self.sim.programs[tl].phases[index].duration
+
+    def setPhaseDuration(self, tl, duration):
+        self.sim.remaining[tl] = duration
+
+    def getAllProgramLogics(self, tl):
+        return [copy.deepcopy(self.sim.programs[tl])]
+
+    def setProgramLogic(self, tl, logic):
+        self.sim.programs[tl] = copy.deepcopy(logic)
+
+
+class VehicleDomain(Domain):
+
+    def getIDList(self):
+        return list(self.sim.vehicles)
+
+    def _value(self, veh, var):
+        if var == tc.VAR_WAITING_TIME:
+            return self._waiting(veh)
+        raise ValueError("vehicle variable {:#x} is not supported".format(var))
+
+    def _waiting(self, veh):
+        route, index, ready = self.sim.vehicles[veh]
+        return max(0., self.sim.time - ready) if route[index] in self.sim.edgeLight else 0.
+
+    def getRoadID(self, veh):
+        route, index, ready = self.sim.vehicles[veh]
+        return route[index]
+
+    def getWaitingTime(self, veh):
+        return self._waiting(veh)
+
+
+class SimulationDomain(Domain):
+
+    def _value(self, objectID, var):
+        if var == tc.VAR_MIN_EXPECTED_VEHICLES:
+            return self._expected()
+        if var == tc.VAR_DEPARTED_VEHICLES_IDS:
+            return list(self.sim.departed)
+        if var == tc.VAR_ARRIVED_VEHICLES_IDS:
+            return list(self.sim.arrived)
+        raise ValueError("simulation variable {:#x} is not supported".format(var))
+
+    def subscribe(self, varIDs=(), *args):
+        Domain.subscribe(self, "", varIDs)
+
+    def getSubscriptionResults(self, objectID=""):
+        return Domain.getSubscriptionResults(self, objectID)
+
+    def _expected(self):
+        return len(self.sim.vehicles) + len(self.sim.pending) - self.sim.nextDeparture
+
+    def getMinExpectedNumber(self):
+        return self._expected()
+
+    def getTime(self):
+        return self.sim.time
+
+    def getDepartedIDList(self):
+        return list(self.sim.departed)
+
+    def getArrivedIDList(self):
+        return list(self.sim.arrived)
+
+
+class FakeTraci:
+    """In-process stand-in for the parts of traci the driver uses.
+
+    The network is read with topology.py and every edge is a point queue:
+    a vehicle needs the free flow travel time to reach the stop line and
+    then waits until the light lets it go. Phase 0 of a light serves its
+    north/south approaches and phase 2 the east/west ones, the odd phases
+    are yellow; a green approach releases saturationFlow vehicles per hour
+    and lane. Vehicles leave the network at the end of their last edge.
+
+    start() takes a sumo command line and plays back the flows and vehicles
+    of its route file, or, when trace is given, the arrivals per approach of
+    a trace saved by recording.py (those vehicles leave after their light).
+    The results only resemble sumo's, the point is to exercise the control
+    loop with realistic traffic and the same TraCI calls without sumo.
+    """
+
+    def __init__(self, trace=None, saturationFlow=1850, speed=13.89, vehicleLength=7.5):
+        self.trace = trace
+        self.saturationFlow = saturationFlow
+        self.speed = speed
+        self.vehicleLength = vehicleLength
+        self.edge = EdgeDomain(self)
+        self.lane = LaneDomain(self)
+        self.trafficlight = TrafficLightDomain(self)
+        self.vehicle = VehicleDomain(self)
+        self.simulation = SimulationDomain(self)
+
+    def start(self, cmd, **kwargs):
+        self.load(cmd[1:])
+
+    def load(self, args):
+        options = {}
+        for i, arg in enumerate(args[:-1]):
+            if arg.startswith("-") and not args[i + 1].startswith("-"):
+                options[arg] = args[i + 1]
+        netFile = options.get("-n", options.get("--net-file"))
+        routeFile = options.get("-r", options.get("--route-files"))
+        self.stepLength = float(options.get("--step-length", 1.))
+        self.topo = topology.load(netFile)
+        self.edges = sorted(self.topo.edges)
+        self.time = 0.
+        self.travelTime = {}
+        self.capacity = {}
+        for edge, (fromNode, toNode, lanes) in self.topo.edges.items():
+            length = self.topo.laneLengths[lanes[0]]
+            self.travelTime[edge] = max(self.stepLength, length / self.speed)
+            self.capacity[edge] = length * len(lanes)
+        self.edgeLight = {}
+        for tl, approaches in self.topo.approaches.items():
+            for direction, edges in approaches.items():
+                for edge in edges:
+                    self.edgeLight[edge] = (tl, 0 if direction in ("north", "south") else 2)
+        self._read_programs(netFile)
+        self.queues = dict((edge, collections.deque()) for edge in self.edges)
+        self.credit = dict((edge, 0.) for edge in self.edgeLight)
+        self.vehicles = {}
+        self.departed = []
+        self.arrived = []
+        self.routes = {}
+        if self.trace:
+            self.pending = self._read_trace(self.trace)
+        else:
+            self.pending = self._read_routes(routeFile)
+        self.nextDeparture = 0
+        for domain in (self.edge, self.lane, self.trafficlight, self.vehicle, self.simulation):
+            domain.subscriptions = {}
+
+    def _read_programs(self, netFile):
+        self.programs = collections.OrderedDict()
+        for event, elem in ET.iterparse(netFile):
+            if elem.tag == "tlLogic":
+                phases = [Phase(float(p.get("duration")), p.get("state")) for p in elem.findall("phase")]
+                self.programs[elem.get("id")] = Logic(elem.get("programID"), 0, 0, phases)
+        self.phase = dict((tl, 0) for tl in self.programs)
+        self.remaining = dict((tl, logic.phases[0].duration) for tl, logic in self.programs.items())
+
+    def _route(self, fromEdge, toEdge):
+        """Fewest edges from fromEdge to toEdge."""
+        key = (fromEdge, toEdge)
+        if key not in self.routes:
+            self.routes[key] = self.topo.route(fromEdge, toEdge)
+        return self.routes[key]
+
+    def _read_routes(self, routeFile):
+        """(depart, id, route) of every vehicle in routeFile, by departure."""
+        routes = {}
+        pending = []
+        for event, elem in ET.iterparse(routeFile):
+            if elem.tag == "route" and elem.get("id"):
+                routes[elem.get("id")] = elem.get("edges").split()
+            elif elem.tag == "flow":
+                if elem.get("route"):
+                    route = routes[elem.get("route")]
+                else:
+                    route = self._route(elem.get("from"), elem.get("to"))
+                begin, end, number = float(elem.get("begin")), float(elem.get("end")), int(elem.get("number"))
+                for i in range(number):
+                    pending.append((begin + i * (end - begin) / number, "{}.{}".format(elem.get("id"), i), route))
+            elif elem.tag == "vehicle":
+                pending.append((float(elem.get("depart")), elem.get("id"), routes[elem.get("route")]))
+        pending.sort(key=lambda p: p[0])
+        return pending
+
+    def _read_trace(self, path):
+        meta, arrays = recording.load(path)
+        arrivals = arrays["arrivals"]
+        pending = []
+        for step, k in zip(*arrivals.nonzero()):
+            for i in range(int(arrivals[step, k])):
+                pending.append((float(step), "trace{}.{}.{}".format(step, k, i), [meta["approaches"][k][0]]))
+        return pending
+
+    def _halting(self, edge):
+        """Ready times of the vehicles waiting at the end of edge, front first."""
+        if edge not in self.edgeLight:
+            return []
+        now = self.time
+        waiting = []
+        for veh in self.queues[edge]:
+            ready = self.vehicles[veh][2]
+            if ready > now:
+                break
+            waiting.append(ready)
+        return waiting
+
+    def _enter(self, veh, route, index):
+        edge = route[index]
+        self.vehicles[veh] = [route, index, self.time + self.travelTime[edge]]
+        self.queues[edge].append(veh)
+
+    def simulationStep(self, time=0.):
+        if time > 0:
+            while self.time < time:
+                self._step()
+        else:
+            self._step()
+
+    def _step(self):
+        dt = self.stepLength
+        self.time += dt
+        now = self.time
+        self.departed = []
+        self.arrived = []
+
+        for tl, logic in self.programs.items():
+            self.remaining[tl] -= dt
+            while self.remaining[tl] <= 0:
+                self.phase[tl] = (self.phase[tl] + 1) % len(logic.phases)
+                self.remaining[tl] += logic.phases[self.phase[tl]].duration
+
+        # vehicles moving on get a ready time after now, so no vehicle moves twice
+        release = self.saturationFlow / 3600. * dt
+        for edge in self.edges:
+            queue = self.queues[edge]
+            light = self.edgeLight.get(edge)
+            if light is None:
+                credit = len(queue)
+            elif self.phase[light[0]] == light[1]:
+                lanes = len(self.topo.edges[edge][2])
+                credit = self.credit[edge] = min(self.credit[edge] + release * lanes, lanes * max(1., release))
+            else:
+                self.credit[edge] = 0.
+                continue
+            while queue and credit >= 1 and self.vehicles[queue[0]][2] <= now:
+                veh = queue.popleft()
+                credit -= 1
+                route, index, ready = self.vehicles[veh]
+                if index + 1 < len(route):
+                    self._enter(veh, route, index + 1)
+                else:
+                    # like sumo, the subscriptions of a vehicle end when it arrives
+                    del self.vehicles[veh]
+                    self.vehicle.subscriptions.pop(veh, None)
+                    self.arrived.append(veh)
+            if light is not None:
+                self.credit[edge] = credit
+
+        while self.nextDeparture < len(self.pending) and self.pending[self.nextDeparture][0] < now:
+            depart, veh, route = self.pending[self.nextDeparture]
+            self.nextDeparture += 1
+            self._enter(veh, route, 0)
+            self.departed.append(veh)
+
+    def close(self, wait=True):
+        self.vehicles = {}
+        self.pending = []
+        self.nextDeparture = 0
@@ -0,0 +1,110 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+
+class FlowCounter:
+    """Arrival rates (veh/h) per approach with memory bounded by the approaches.
+
+    A vehicle is counted once, in the step it first shows up on an approach.
+    Vehicle IDs are mapped to small integer handles that are recycled when
+    the vehicle leaves the network, so only the vehicles currently on an
+    approach are remembered. Rates are taken over the last ``window``
+    seconds or, when ``decay`` is given, as an exponentially weighted average
+    where every second keeps ``decay`` of the previous estimate. Steps last
+    ``stepLength`` seconds.
+    """
+
+    def __init__(self, approaches, window=300, decay=None, stepLength=1.):
+        if decay is not None and not 0 < decay < 1:
+            raise ValueError("decay must lie between 0 and 1")
+        window = max(1, int(round(window / stepLength)))
+        self.window = window
+        self.decay = None if decay is None else decay ** stepLength
+        self.stepLength = stepLength
+        self.handles = {}
+        self.freeHandles = []
+        self.present = [set() for _ in range(approaches)]
+        self.arrivals = np.zeros(approaches)
+        self.buckets = np.zeros((window, approaches), dtype=np.int32)
+        self.totals = np.zeros(approaches, dtype=np.int64)
+        self.average = np.zeros(approaches)
+        self.steps = 0
+
+    def handle(self, veh):
+        h = self.handles.get(veh)
+        if h is None:
+            h = self.freeHandles.pop() if self.freeHandles else len(self.handles)
+            self.handles[veh] = h
+        return h
+
+    def release(self, vehicles):
+        for veh in vehicles:
+            h = self.handles.pop(veh, None)
+            if h is not None:
+                self.freeHandles.append(h)
+
+    def update(self, vehicleLists):
+        """Record one simulation step; vehicleLists holds the vehicle IDs per approach."""
+        arrivals = self.arrivals
+        for i, vehicles in enumerate(vehicleLists):
+            now = set(self.handle(veh) for veh in vehicles)
+            arrivals[i] = len(now - self.present[i])
+            self.present[i] = now
+
+        if self.decay is None:
+            slot = self.steps % self.window
+            self.totals += arrivals.astype(np.int64) - self.buckets[slot]
+            self.buckets[slot] = arrivals
+        else:
+            self.average *= self.decay
+            self.average += (1 - self.decay) * arrivals
+        self.steps += 1
+
+    def rates(self, approaches=None):
+        if self.decay is None:
+            rates = self.totals * 3600. / (max(1, min(self.steps, self.window)) * self.stepLength)
+        else:
+            rates = self.average * 3600. / self.stepLength
+        return rates if approaches is None else rates[approaches]
+
+
+class DetectorCounter:
+    """Arrival rates (veh/h) per approach read from induction loops or lane area detectors.
+
+    detectors[i] lists the (domain, id) pairs of approach i, domain being
+    the inductionloop or lanearea module of the connection. The detectors
+    must run with a period longer than the simulation, so that their
+    interval vehicle number counts every vehicle since the start. rates()
+    reads one count per detector of the requested approaches and takes the
+    difference to the oldest sample at least ``window`` seconds back; nothing
+    is transferred in steps without a decision.
+    """
+
+    def __init__(self, detectors, window=300, stepLength=1.):
+        self.detectors = detectors
+        self.window = max(1, int(round(window / stepLength)))
+        self.stepLength = stepLength
+        self.samples = [collections.deque([(0, 0)]) for _ in detectors]
+        self.steps = 0
+
+    def update(self):
+        self.steps += 1
+
+    def rates(self, approaches=None):
+        if approaches is None:
+            approaches = range(len(self.detectors))
+        rates = np.zeros(len(approaches))
+        for k, i in enumerate(approaches):
+            count = sum(domain.getIntervalVehicleNumber(det) for domain, det in self.detectors[i])
+            samples = self.samples[i]
+            if samples[-1][0] != self.steps:
+                samples.append((self.steps, count))
+            while len(samples) > 2 and samples[1][0] <= self.steps - self.window:
+                samples.popleft()
+            step, base = samples[0]
+            rates[k] = (count - base) * 3600. / (max(1, self.steps - step) * self.stepLength)
+        return rates
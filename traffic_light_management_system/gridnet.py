@@ -0,0 +1,141 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import shutil
+import tempfile
+import optparse
+import subprocess
+
+# we need to import python modules from the $SUMO_HOME/tools directory
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+from sumolib import checkBinary  # noqa
+
+# heading of a vehicle: (prefix of the edge it enters a cell on, row step, column step, exit prefix at the border)
+HEADINGS = {
+    "east": ("w", 0, 1, "e"),
+    "west": ("e", 0, -1, "w"),
+    "south": ("n", 1, 0, "s"),
+    "north": ("s", -1, 0, "n"),
+}
+RIGHT = {"east": "south", "south": "west", "west": "north", "north": "east"}
+LEFT = {"east": "north", "north": "west", "west": "south", "south": "east"}
+
+
+def cell(r, c, cols):
+    """Number of cell (r, c), counted row by row from 1; it names the cell's edges, junction and light."""
+    return c + r * cols + 1
+
+
+def outgoing(heading, r, c, rows, cols):
+    """Edge a vehicle leaving cell (r, c) in heading drives on."""
+    prefix, dr, dc, exitPrefix = HEADINGS[heading]
+    if 0 <= r + dr < rows and 0 <= c + dc < cols:
+        return "{}{}i".format(prefix, cell(r + dr, c + dc, cols))
+    return "{}{}o".format(exitPrefix, cell(r, c, cols))
+
+
+def write_plain(plainPrefix, rows, cols, turns=False, spacing=100., lanes=3, speed=13.89):
+    """Write the plain node, edge and connection files of a rows x cols grid.
+
+    Cell (r, c) has the number i = c + r * cols + 1. The edges are named
+    after it like those of the data/ nets and demand.py: w{i}i enters cell i
+    from the west, e{i}o leaves the grid eastwards from cell i and so on.
+    The junctions are not numbered like the data/ nets, which count their
+    border nodes too: the traffic light junction of cell i and its light
+    both have the ID i, and the border node where w{i}i starts is "w{i}".
+    Without turns every lane only continues straight on; with turns the
+    rightmost lane may also turn right and the leftmost one left.
+    """
+    nodes = ['<nodes>\n']
+    edges = ['<edges>\n']
+    connections = ['<connections>\n']
+
+    def edge(edgeId, fromNode, toNode):
+        edges.append('    <edge id="{}" from="{}" to="{}" priority="-1" numLanes="{}" speed="{}"/>\n'.format(
+            edgeId, fromNode, toNode, lanes, speed))
+
+    for r in range(rows):
+        for c in range(cols):
+            i = cell(r, c, cols)
+            nodes.append('    <node id="{}" x="{:.2f}" y="{:.2f}" type="traffic_light"/>\n'.format(
+                i, c * spacing, -r * spacing))
+    for r in range(rows):
+        for c in range(cols):
+            i = cell(r, c, cols)
+            for heading, (prefix, dr, dc, exitPrefix) in HEADINGS.items():
+                # the edge entering cell i in this heading starts at the neighbour or a border node
+                fr, fc = r - dr, c - dc
+                if 0 <= fr < rows and 0 <= fc < cols:
+                    edge("{}{}i".format(prefix, i), cell(fr, fc, cols), i)
+                else:
+                    border = "{}{}".format(prefix, i)
+                    nodes.append('    <node id="{}" x="{:.2f}" y="{:.2f}" type="priority"/>\n'.format(
+                        border, fc * spacing, -fr * spacing))
+                    edge("{}{}i".format(prefix, i), border, i)
+                    # the border node also takes the traffic leaving the grid on this side
+                    edge("{}{}o".format(prefix, i), i, border)
+
+    for r in range(rows):
+        for c in range(cols):
+            i = cell(r, c, cols)
+            for heading, (prefix, dr, dc, exitPrefix) in HEADINGS.items():
+                incoming = "{}{}i".format(prefix, i)
+                straight = outgoing(heading, r, c, rows, cols)
+                for lane in range(lanes):
+                    connections.append('    <connection from="{}" to="{}" fromLane="{}" toLane="{}"/>\n'.format(
+                        incoming, straight, lane, lane))
+                if turns:
+                    connections.append('    <connection from="{}" to="{}" fromLane="0" toLane="0"/>\n'.format(
+                        incoming, outgoing(RIGHT[heading], r, c, rows, cols)))
+                    connections.append('    <connection from="{}" to="{}" fromLane="{}" toLane="{}"/>\n'.format(
+                        incoming, outgoing(LEFT[heading], r, c, rows, cols), lanes - 1, lanes - 1))
+
+    nodes.append('</nodes>\n')
+    edges.append('</edges>\n')
+    connections.append('</connections>\n')
+    for suffix, lines in ((".nod.xml", nodes), (".edg.xml", edges), (".con.xml", connections)):
+        with open(plainPrefix + suffix, "w") as out:
+            out.write("".join(lines))
+
+
+def build(netFile, rows, cols, turns=False, green=42, yellow=4, **kwargs):
+    """Write the grid to netFile with netconvert; phase 0 serves north/south, phase 2 east/west."""
+    tmpDir = tempfile.mkdtemp()
+    try:
+        plainPrefix = os.path.join(tmpDir, "grid")
+        write_plain(plainPrefix, rows, cols, turns, **kwargs)
+        subprocess.check_call([checkBinary("netconvert"),
+                               "-n", plainPrefix + ".nod.xml", "-e", plainPrefix + ".edg.xml", "-x", plainPrefix + ".con.xml",
+                               "-o", netFile, "--no-turnarounds", "true", "--offset.disable-normalization", "true",
+                               "--tls.layout", "opposites", "--tls.green.time", str(green),
+                               "--tls.yellow.time", str(yellow), "--tls.left-green.time", "0",
+                               "--no-warnings", "true"], stdout=subprocess.DEVNULL)
+    finally:
+        shutil.rmtree(tmpDir)
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--rows", type="int", default=2, help="rows of traffic lights")
+    optParser.add_option("--cols", type="int", default=3, help="columns of traffic lights")
+    optParser.add_option("--turns", action="store_true", default=False,
+                         help="let the outer lanes turn right and left")
+    optParser.add_option("--spacing", type="float", default=100., help="distance between the junctions")
+    optParser.add_option("-o", "--output", help="net file to write, defaults to data/gridROWSxCOLS[_turns].net.xml")
+    options, args = optParser.parse_args()
+    if options.output is None:
+        options.output = "data/grid{}x{}{}.net.xml".format(options.rows, options.cols, "_turns" if options.turns else "")
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    build(options.output, options.rows, options.cols, options.turns, spacing=options.spacing)
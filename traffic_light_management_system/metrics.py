@@ -0,0 +1,84 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import sys
+
+
+class Metrics:
+    """Waiting time, queue and stop statistics accumulated from edge totals.
+
+    Every step adds the summed waiting time, the vehicle count and the
+    halting count of all edges (internal ones included, so every vehicle in
+    the network is covered) as delivered by the edge subscriptions of an
+    observation.Observer. This costs O(edges) per step and no per-vehicle
+    traffic. averageWaitingTime() is the KPI the runners always reported:
+    the waiting time of every vehicle in every step over the number of
+    vehicle steps.
+
+    stops counts the steps in which the halting number of an edge grew, by
+    the amount it grew; vehicles that stop and start on the same edge in one
+    step cancel out, so it is a lower bound.
+
+    With verify the observer must also subscribe every vehicle's waiting
+    time; the per-vehicle sums are then kept as well and the largest
+    difference per step is tracked in maxDeviation.
+    """
+
+    def __init__(self, obs, verify=False):
+        self.obs = obs
+        self.verify = verify
+        self.sumWait = 0.
+        self.vehicleSteps = 0
+        self.sumQueue = 0
+        self.maxQueue = 0
+        self.stops = 0
+        self.steps = 0
+        self.halting = dict((e, 0) for e in obs.edges)
+        self.vehicleSumWait = 0.
+        self.vehicleCount = 0
+        self.maxDeviation = 0.
+
+    def update(self):
+        obs = self.obs
+        wait = 0.
+        vehicles = 0
+        queue = 0
+        halting = self.halting
+        for e in obs.edges:
+            wait += obs.edgeWaitingTime(e)
+            vehicles += obs.edgeVehicleNumber(e)
+            h = obs.edgeHaltingNumber(e)
+            if h > halting[e]:
+                self.stops += h - halting[e]
+            halting[e] = h
+            queue += h
+        self.sumWait += wait
+        self.vehicleSteps += vehicles
+        self.sumQueue += queue
+        self.maxQueue = max(self.maxQueue, queue)
+        self.steps += 1
+
+        if self.verify:
+            waits = obs.waitingTimes()
+            self.vehicleSumWait += sum(waits)
+            self.vehicleCount += len(waits)
+            self.maxDeviation = max(self.maxDeviation, abs(sum(waits) - wait), abs(len(waits) - vehicles))
+
+    def averageWaitingTime(self):
+        return self.sumWait / self.vehicleSteps
+
+    def averageQueue(self):
+        return self.sumQueue / max(1, self.steps)
+
+    def report(self):
+        lines = ["Average queue length (halting vehicles): {:.2f}, maximum {}".format(self.averageQueue(), self.maxQueue),
+                 "Stops: {}".format(self.stops)]
+        if self.verify:
+            lines.append("Per-vehicle average waiting time: {} (largest per step deviation {:.6f})".format(
+                self.vehicleSumWait / self.vehicleCount, self.maxDeviation))
+        return "\n".join(lines)
+
+    def check(self, tolerance=1e-6):
+        """With verify, exit when the edge totals and the per-vehicle sums disagree."""
+        if self.verify and self.maxDeviation > tolerance:
+            sys.exit("edge metrics deviate from the per-vehicle values by {}".format(self.maxDeviation))
@@ -0,0 +1,123 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+try:
+    import traci.constants as tc
+except ImportError:
+    # without sumo only fake_traci can be observed, it brings the constants
+    from fake_traci import constants as tc
+
+
+class Observer:
+    """Batched per-step view of the network built on TraCI subscriptions.
+
+    All values are delivered together with the reply to simulationStep, so
+    reading them costs no extra round trips. Every edge reports its
+    occupancy, summed waiting time, vehicle and halting numbers. Per-vehicle
+    waiting times are only subscribed with vehicleWaiting; the subscriptions
+    of newly departed vehicles are then the only calls issued per step.
+    """
+
+    EDGE_VARIABLES = [tc.LAST_STEP_OCCUPANCY, tc.VAR_WAITING_TIME, tc.LAST_STEP_VEHICLE_NUMBER,
+                      tc.LAST_STEP_VEHICLE_HALTING_NUMBER]
+
+    def __init__(self, conn, edges, approachEdges=(), phaseTls=(), vehicleWaiting=False):
+        self.conn = conn
+        self.edges = list(edges)
+        self.phaseTls = list(phaseTls)
+        self.vehicleWaiting = vehicleWaiting
+
+        approachEdges = set(approachEdges)
+        for e in self.edges:
+            if e in approachEdges:
+                conn.edge.subscribe(e, self.EDGE_VARIABLES + [tc.LAST_STEP_VEHICLE_ID_LIST])
+            else:
+                conn.edge.subscribe(e, self.EDGE_VARIABLES)
+        conn.simulation.subscribe([tc.VAR_MIN_EXPECTED_VEHICLES, tc.VAR_DEPARTED_VEHICLES_IDS,
+                                  tc.VAR_ARRIVED_VEHICLES_IDS])
+        if vehicleWaiting:
+            for veh in conn.vehicle.getIDList():
+                conn.vehicle.subscribe(veh, [tc.VAR_WAITING_TIME])
+        for tl in self.phaseTls:
+            conn.trafficlight.subscribe(tl, [tc.TL_CURRENT_PHASE])
+
+        self.update()
+
+    def update(self):
+        conn = self.conn
+        self.sim = conn.simulation.getSubscriptionResults()
+        self.edgeValues = conn.edge.getAllSubscriptionResults()
+        if self.vehicleWaiting:
+            for veh in self.sim[tc.VAR_DEPARTED_VEHICLES_IDS]:
+                conn.vehicle.subscribe(veh, [tc.VAR_WAITING_TIME])
+            self.vehicles = conn.vehicle.getAllSubscriptionResults()
+        if self.phaseTls:
+            self.phases = conn.trafficlight.getAllSubscriptionResults()
+
+    def minExpectedNumber(self):
+        return self.sim[tc.VAR_MIN_EXPECTED_VEHICLES]
+
+    def arrivedVehicles(self):
+        return self.sim[tc.VAR_ARRIVED_VEHICLES_IDS]
+
+    def edgeVehicles(self, e):
+        return self.edgeValues[e][tc.LAST_STEP_VEHICLE_ID_LIST]
+
+    def edgeOccupancy(self, e):
+        return self.edgeValues[e][tc.LAST_STEP_OCCUPANCY]
+
+    def edgeWaitingTime(self, e):
+        return self.edgeValues[e][tc.VAR_WAITING_TIME]
+
+    def edgeVehicleNumber(self, e):
+        return self.edgeValues[e][tc.LAST_STEP_VEHICLE_NUMBER]
+
+    def edgeHaltingNumber(self, e):
+        return self.edgeValues[e][tc.LAST_STEP_VEHICLE_HALTING_NUMBER]
+
+    def phase(self, tl):
+        return self.phases[tl][tc.TL_CURRENT_PHASE]
+
+    def waitingTimes(self):
+        return [v[tc.VAR_WAITING_TIME] for v in self.vehicles.values()]
+
+
+class Snapshot:
+    """What a controller sees of all lights in one step.
+
+    flows() are the counted approach flows (veh/h) indexed
+    [light, direction] in topology.DIRECTIONS order; they are computed at
+    most once per step and only when a controller asks for them.
+    flows(lights) returns the rows of the given light indices only, which
+    spares a detector based counter from reading the other detectors.
+    time is the simulated time in seconds at the start of the step.
+    """
+
+    def __init__(self, obs, counter, tls, directions, stepLength=1.):
+        self.obs = obs
+        self.counter = counter
+        self.tls = list(tls)
+        self.directions = directions
+        self.stepLength = stepLength
+        self.step = 0
+        self.time = 0
+        self.cachedFlows = None
+
+    def advance(self, step):
+        self.step = step
+        self.time = step * self.stepLength
+        self.cachedFlows = None
+
+    def flows(self, lights=None):
+        n = len(self.directions)
+        if lights is not None:
+            return self.counter.rates([tl * n + d for tl in lights for d in range(n)]).reshape(len(lights), n)
+        if self.cachedFlows is None:
+            self.cachedFlows = self.counter.rates().reshape(len(self.tls), n)
+        return self.cachedFlows
+
+    def edges(self):
+        return self.obs.edges
+
+    def occupancy(self, e):
+        return self.obs.edgeOccupancy(e)
@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import pickle
+import collections
+
+import numpy as np
+
+import webster
+
+
+class PlanCache:
+    """Webster plans keyed by the flow ratios of the phases, quantized to bucket.
+
+    A plan is computed once per bucket, from the ratios at the bucket
+    centre, so equal keys always give equal plans. The plan parameters are
+    part of the key, so one file can serve controllers with different
+    settings. At most size plans are kept, the least recently used go first.
+    With path the cache is read from and save()d to that pickle file.
+    """
+
+    def __init__(self, bucket=0.02, size=4096, path=None):
+        self.bucket = bucket
+        self.size = size
+        self.path = path
+        self.plans = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            with open(path, "rb") as cache:
+                self.plans = pickle.load(cache)
+
+    def keys(self, flows, saturationFlow=1850):
+        """Quantized flow ratios of flows[light, phase(, approach)], one tuple per light."""
+        ratios = np.asarray(flows, dtype=float) / saturationFlow
+        if ratios.ndim == 3:
+            ratios = ratios.max(axis=2)
+        return [tuple(row) for row in np.rint(ratios / self.bucket).astype(int).tolist()]
+
+    def lookup(self, flows, saturationFlow=1850, lostTime=8, maxCycle=None, minRatio=0.001):
+        """Return (cycles, greens, keys) for flows like webster.timings(); keys are the buckets of the lights."""
+        keys = self.keys(flows, saturationFlow)
+        full = [(saturationFlow, lostTime, maxCycle, minRatio) + k for k in keys]
+        missing = sorted(set(k for k in full if k not in self.plans))
+        if missing:
+            centres = np.array([k[4:] for k in missing], dtype=float) * self.bucket * saturationFlow
+            cycles, greens = webster.timings(centres, saturationFlow, lostTime, maxCycle, minRatio)
+            for k, cycle, green in zip(missing, cycles.tolist(), greens.tolist()):
+                self.plans[k] = (cycle, green)
+        self.misses += len(missing)
+        self.hits += len(full) - len(missing)
+
+        cycles = np.empty(len(full))
+        greens = np.empty((len(full), len(keys[0]) if keys else 0))
+        for i, k in enumerate(full):
+            cycles[i], greens[i] = self.plans[k]
+            self.plans.move_to_end(k)
+        while len(self.plans) > self.size:
+            self.plans.popitem(last=False)
+        return cycles, greens, keys
+
+    def save(self):
+        if self.path is None:
+            return
+        # write to a temporary file first so parallel runs never read half a cache
+        tmpFile = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmpFile, "wb") as cache:
+            pickle.dump(self.plans, cache, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpFile, self.path)
+
+    def report(self):
+        return "Plan cache: {} hits, {} misses, {} plans".format(self.hits, self.misses, len(self.plans))
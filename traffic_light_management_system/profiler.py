@@ -0,0 +1,170 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import json
+import contextlib
+from time import perf_counter
+
+import numpy as np
+
+DOMAINS = ("edge", "lane", "trafficlight", "vehicle", "simulation", "junction", "inductionloop", "lanearea")
+SECTIONS = ("observation", "controller", "simulation")
+# log spaced histogram bins from 1 microsecond to 10 seconds
+BINS = np.logspace(-6, 1, 43)
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off, every hook is a no-op."""
+
+    def __init__(self):
+        self.null = contextlib.nullcontext()
+
+    def instrument(self, conn):
+        pass
+
+    def restore(self):
+        pass
+
+    def section(self, name):
+        return self.null
+
+    def light(self, tl):
+        return self.null
+
+    def endStep(self):
+        pass
+
+
+class Profiler(NullProfiler):
+    """Counts and times TraCI calls and splits every step into sections.
+
+    instrument() wraps every public method of the TraCI domains (and
+    simulationStep) of a traci/libsumo module or connection. run() marks its
+    observation, controller and simulation parts with section(), decisions
+    of single lights with light(), and closes each step with endStep().
+    """
+
+    def __init__(self, stepBudget=None):
+        self.stepBudget = stepBudget
+        self.calls = {}
+        self.patched = []
+        self.current = dict((s, 0.) for s in SECTIONS)
+        self.sectionTimes = dict((s, []) for s in SECTIONS)
+        self.stepTimes = []
+        self.lightTimes = {}
+        self.step = 0
+
+    def wrap(self, key, func):
+        stats = self.calls.setdefault(key, [0, 0.])
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += perf_counter() - start
+        return timed
+
+    def patch(self, owner, name, key):
+        self.patched.append((owner, name, vars(owner).get(name)))
+        setattr(owner, name, self.wrap(key, getattr(owner, name)))
+
+    def instrument(self, conn):
+        for domainName in DOMAINS:
+            domain = getattr(conn, domainName, None)
+            if domain is None:
+                continue
+            for name in dir(domain):
+                if name.startswith("_") or not callable(getattr(domain, name)) or isinstance(getattr(domain, name), type):
+                    continue
+                self.patch(domain, name, domainName + "." + name)
+        self.patch(conn, "simulationStep", "simulation.simulationStep")
+
+    def restore(self):
+        for owner, name, original in reversed(self.patched):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.patched = []
+
+    @contextlib.contextmanager
+    def section(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.current[name] += perf_counter() - start
+
+    @contextlib.contextmanager
+    def light(self, tl):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.lightTimes.setdefault(tl, []).append((self.step, perf_counter() - start))
+
+    def endStep(self):
+        total = 0.
+        for name in SECTIONS:
+            self.sectionTimes[name].append(self.current[name])
+            total += self.current[name]
+            self.current[name] = 0.
+        self.stepTimes.append(total)
+        self.step += 1
+
+    def overBudget(self):
+        if self.stepBudget is None:
+            return 0
+        return int(np.count_nonzero(np.asarray(self.stepTimes) > self.stepBudget))
+
+    def report(self):
+        report = {
+            "steps": self.step,
+            "stepBudget": self.stepBudget,
+            "overBudget": self.overBudget(),
+            "step": describe(self.stepTimes),
+            "sections": dict((name, describe(times)) for name, times in self.sectionTimes.items()),
+            "calls": dict((key, {"count": count, "total": total, "mean": total / count if count else 0.})
+                          for key, (count, total) in sorted(self.calls.items()) if count),
+            "lights": dict((tl, {"decisions": len(trace), "total": sum(t for _, t in trace), "trace": trace})
+                           for tl, trace in self.lightTimes.items()),
+        }
+        return report
+
+    def export(self, path):
+        with open(path, "w") as out:
+            json.dump(self.report(), out, indent=1)
+
+    def summary(self):
+        lines = []
+        for name in ("step",) + SECTIONS:
+            times = self.stepTimes if name == "step" else self.sectionTimes[name]
+            d = describe(times)
+            lines.append("{:<12} mean {:8.3f} ms  p99 {:8.3f} ms  max {:8.3f} ms".format(
+                name, d["mean"] * 1e3, d["p99"] * 1e3, d["max"] * 1e3))
+        # every wrapped function has an entry, the ones never called are left out as in export()
+        called = [(key, stats) for key, stats in self.calls.items() if stats[0]]
+        for key, (count, total) in sorted(called, key=lambda item: -item[1][1])[:10]:
+            lines.append("{:<40} {:>9} calls {:10.3f} s".format(key, count, total))
+        if self.stepBudget is not None:
+            lines.append("{} of {} steps over the {:.3f} ms budget".format(
+                self.overBudget(), self.step, self.stepBudget * 1e3))
+        return "\n".join(lines)
+
+
+def describe(times):
+    times = np.asarray(times, dtype=float)
+    if not len(times):
+        return {"total": 0., "mean": 0., "p50": 0., "p99": 0., "max": 0.,
+                "histogram": {"bins": BINS.tolist(), "counts": [0] * (len(BINS) - 1)}}
+    counts, _ = np.histogram(np.clip(times, BINS[0], BINS[-1]), BINS)
+    return {
+        "total": float(times.sum()),
+        "mean": float(times.mean()),
+        "p50": float(np.percentile(times, 50)),
+        "p99": float(np.percentile(times, 99)),
+        "max": float(times.max()),
+        "histogram": {"bins": BINS.tolist(), "counts": counts.tolist()},
+    }
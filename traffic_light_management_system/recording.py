@@ -0,0 +1,66 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import json
+
+import numpy as np
+
+# per step arrays of a trace, their dtype and whether they hold one column per approach or per light
+ARRAYS = (
+    ("arrivals", np.uint16, "approach"),
+    ("counts", np.uint16, "approach"),
+    ("occupancy", np.float32, "approach"),
+    ("phase", np.int8, "light"),
+)
+
+
+class TraceRecorder:
+    """Writes what the driver observed in every step into memory-mapped .npy files.
+
+    A trace is a directory holding meta.json and one array per entry of
+    ARRAYS with a row per step: the vehicles that newly arrived on each
+    approach, the vehicles on it, its mean occupancy and the current phase of
+    each light. Approach columns follow the driver's order, i.e.
+    len(DIRECTIONS) * light + direction.
+    """
+
+    def __init__(self, path, tls, directions, approaches, maxSteps):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.meta = {
+            "tls": list(tls),
+            "directions": list(directions),
+            "approaches": [list(a) for a in approaches],
+            "steps": 0,
+        }
+        self.arrays = {}
+        for name, dtype, kind in ARRAYS:
+            columns = len(approaches) if kind == "approach" else len(tls)
+            self.arrays[name] = np.lib.format.open_memmap(
+                os.path.join(path, name + ".npy"), mode="w+", dtype=dtype, shape=(maxSteps, columns))
+
+    def record(self, arrivals, counts, occupancy, phase):
+        row = self.meta["steps"]
+        self.arrays["arrivals"][row] = arrivals
+        self.arrays["counts"][row] = counts
+        self.arrays["occupancy"][row] = occupancy
+        self.arrays["phase"][row] = phase
+        self.meta["steps"] += 1
+
+    def close(self):
+        for array in self.arrays.values():
+            array.flush()
+        with open(os.path.join(self.path, "meta.json"), "w") as meta:
+            json.dump(self.meta, meta, indent=1)
+
+
+def load(path):
+    """Return (meta, arrays) of a recorded trace, the arrays memory-mapped read-only."""
+    with open(os.path.join(path, "meta.json")) as meta:
+        meta = json.load(meta)
+    arrays = {}
+    for name, dtype, kind in ARRAYS:
+        arrays[name] = np.load(os.path.join(path, name + ".npy"), mmap_mode="r")[:meta["steps"]]
+    return meta, arrays
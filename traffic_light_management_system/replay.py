@@ -0,0 +1,163 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import sys
+import optparse
+import itertools
+from time import perf_counter
+
+import numpy as np
+
+import webster
+import recording
+
+# program of the lights in the net files: 42 s green per phase, 4 s yellow
+PROGRAM_GREEN = 42
+YELLOW = 4
+PARAMETERS = ("lostTime", "saturationFlow", "maxCycle", "firstCycle", "flowWindow")
+
+
+def served(offset, greenNS):
+    """Masks of the lights whose north/south and east/west approaches have green.
+
+    offset counts the steps since the last plan was set, which switches to
+    phase 0 with greenNS seconds. SUMO then runs on through the program of
+    the net file until the next plan.
+    """
+    ns = offset < greenNS
+    rest = offset - greenNS - YELLOW
+    ew = (rest >= 0) & (rest < PROGRAM_GREEN)
+    rest = rest - PROGRAM_GREEN - YELLOW
+    cycle = rest % (2 * (PROGRAM_GREEN + YELLOW))
+    ns |= (rest >= 0) & (cycle < PROGRAM_GREEN)
+    ew |= (rest >= 0) & (cycle >= PROGRAM_GREEN + YELLOW) & (cycle < 2 * PROGRAM_GREEN + YELLOW)
+    return ns, ew
+
+
+def evaluate(meta, arrays, lostTime, saturationFlow, maxCycle, firstCycle, flowWindow):
+    """Replay a trace for K parameter settings at once and return their scores.
+
+    Every argument after arrays holds one value per setting. The recorded
+    arrivals feed a point queue per approach that discharges at the
+    saturation flow while its phase is green; plans are set like
+    controllers.WebsterAdaptive does, from the arrival rates over the last
+    flowWindow steps. The score is the mean time a vehicle spends queued.
+
+    The plans do not depend on the queues, so all decisions are taken
+    before the queues are run through the steps, which then cost a handful
+    of array operations per step for all settings together.
+    """
+    lostTime, saturationFlow, maxCycle = (np.asarray(v, dtype=float) for v in (lostTime, saturationFlow, maxCycle))
+    firstCycle, flowWindow = (np.asarray(v, dtype=int) for v in (firstCycle, flowWindow))
+    arrivals = np.asarray(arrays["arrivals"], dtype=float)
+    steps = len(arrivals)
+    lights = len(meta["tls"])
+    directions = meta["directions"]
+    north, east, south, west = (directions.index(d) for d in ("north", "east", "south", "west"))
+    K = len(lostTime)
+
+    # cumulative[s] holds the arrivals of the steps before step s + 1
+    cumulative = np.zeros((steps + 1, arrivals.shape[1]))
+    np.cumsum(arrivals, axis=0, out=cumulative[1:])
+    cumulative = cumulative.reshape(steps + 1, lights, len(directions))
+
+    # served() for every green time and step, looked up instead of recomputed: row
+    # offset * len(greenTimes) + greenNS holds which of the directions have green
+    offsets = np.arange(steps + 1)
+    greenTimes = np.arange(int(max(maxCycle.max(), PROGRAM_GREEN)) + 1)
+    tableNS, tableEW = served(offsets[:, None], greenTimes[None, :])
+    table = np.empty((steps + 1, len(greenTimes), len(directions)), dtype=bool)
+    table[:, :, north] = table[:, :, south] = tableNS
+    table[:, :, east] = table[:, :, west] = tableEW
+    table = table.reshape(-1, len(directions))
+
+    # one round per cycle of every setting and light instead of one per step
+    decisions = []
+    nextCycle = np.repeat(firstCycle[:, None], lights, axis=1)
+    while True:
+        k, light = np.nonzero(nextCycle <= steps)
+        if not len(k):
+            break
+        step = nextCycle[k, light]
+        first = np.maximum(0, step - 1 - flowWindow[k])
+        counted = np.maximum(1, np.minimum(step - 1, flowWindow[k]))
+        rates = (cumulative[step - 1, light] - cumulative[first, light]) * 3600. / counted[:, None]
+        flows = np.stack([rates[:, [north, south]], rates[:, [east, west]]], axis=1)
+        cycles, greens = webster.timings(flows, saturationFlow[k][:, None, None], lostTime[k], maxCycle[k])
+        cycles = np.ceil(cycles).astype(int)
+        # a plan without a cycle is never followed by another decision
+        nextCycle[k, light] = np.where(cycles > 0, step + cycles, steps + 1)
+        greenNS = np.minimum(np.ceil(greens[:, 0]), greenTimes[-1]).astype(int)
+        # table row of the plan at step 0, the current step is added in the loop below
+        decisions.append((step, k, light, greenNS - step * len(greenTimes)))
+    if not decisions:
+        decisions = [(np.zeros(0, dtype=int),) * 4]
+    step, k, light, row = (np.concatenate(d) for d in zip(*decisions))
+    order = np.argsort(step, kind="stable")
+    step, k, light, row = step[order], k[order], light[order], row[order]
+    bounds = np.searchsorted(step, np.arange(1, steps + 2))
+
+    arrivals = arrivals.reshape(steps, lights, len(directions))
+    queue = np.zeros((K, lights, len(directions)))
+    queued = np.zeros((K, lights, len(directions)))
+    green = np.empty((K, lights, len(directions)), dtype=bool)
+    release = np.empty((K, lights, len(directions)))
+    discharge = np.repeat(saturationFlow / 3600., lights * len(directions)).reshape(queue.shape)
+    rows = np.full((K, lights), PROGRAM_GREEN)
+
+    for s in range(1, steps + 1):
+        first, last = bounds[s - 1], bounds[s]
+        if last > first:
+            rows[k[first:last], light[first:last]] = row[first:last]
+        np.take(table, rows + s * len(greenTimes), axis=0, out=green)
+        np.multiply(green, discharge, out=release)
+        queue += arrivals[s - 1]
+        queue -= release
+        np.maximum(queue, 0., out=queue)
+        queued += queue
+
+    queued = queued.sum(axis=(1, 2))
+    return queued / max(1., arrivals.sum())
+
+
+def grid(**values):
+    """Cartesian product of the value lists, as one array per parameter."""
+    names = [p for p in PARAMETERS if p in values]
+    product = np.array(list(itertools.product(*(values[p] for p in names))), dtype=float)
+    return dict((p, product[:, i]) for i, p in enumerate(names))
+
+
+def get_options():
+    optParser = optparse.OptionParser(usage="%prog [options] TRACEDIR")
+    optParser.add_option("--lost-time", default="8", help="comma separated values of the lost time per cycle")
+    optParser.add_option("--saturation-flow", default="1850", help="comma separated saturation flows (veh/h)")
+    optParser.add_option("--max-cycle", default="42", help="comma separated caps of the cycle length")
+    optParser.add_option("--first-cycle", default="42", help="comma separated steps of the first decision")
+    optParser.add_option("--flow-window", default="300", help="comma separated flow windows in steps")
+    optParser.add_option("--top", type="int", default=10, help="number of best settings to list")
+    options, args = optParser.parse_args()
+    if len(args) != 1:
+        optParser.error("expected one trace directory")
+    return options, args[0]
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options, tracePath = get_options()
+    meta, arrays = recording.load(tracePath)
+    settings = grid(lostTime=[float(v) for v in options.lost_time.split(",")],
+                    saturationFlow=[float(v) for v in options.saturation_flow.split(",")],
+                    maxCycle=[float(v) for v in options.max_cycle.split(",")],
+                    firstCycle=[int(v) for v in options.first_cycle.split(",")],
+                    flowWindow=[int(v) for v in options.flow_window.split(",")])
+    start = perf_counter()
+    scores = evaluate(meta, arrays, **settings)
+    elapsed = perf_counter() - start
+    print("{:>9} {:>10} {:>9} {:>10} {:>10} {:>9}".format(
+        "lostTime", "saturation", "maxCycle", "firstCycle", "flowWindow", "queued"))
+    for i in np.argsort(scores)[:options.top]:
+        print("{:>9g} {:>10g} {:>9g} {:>10g} {:>10g} {:>9.2f}".format(
+            *[settings[p][i] for p in PARAMETERS] + [scores[i]]))
+    print("{} settings over {} steps in {:.2f} s ({:.0f} settings/s)".format(
+        len(scores), meta["steps"], elapsed, len(scores) / elapsed))
+    sys.stdout.flush()
@@ -23,7 +23,6 @@ from __future__ import print_function
 
 import os
 import sys
-import optparse
 import random
 
 # we need to import python modules from the $SUMO_HOME/tools directory
@@ -33,18 +32,19 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("please declare environment variable 'SUMO_HOME'")
 
-from sumolib import checkBinary  # noqa
 import traci  # noqa
+import driver  # noqa
+import controllers  # noqa
 
-MAX_STEP = 3600
+MAX_STEP = driver.MAX_STEP
 
 
-def generate_routefile():
+def generate_routefile(routeFile="data/cross.rou.xml"):
     # random.seed(42)  # make tests reproducible
     # demand per second from different directions
 
     # maxrand = 8
-    with open("data/cross.rou.xml", "w") as routes:
+    with open(routeFile, "w") as routes:
         print("""<routes>
 
         <route id="right" edges="w1i w2i e2o" />
@@ -72,87 +72,34 @@ def generate_routefile():
         print("</routes>", file=routes)
 
 
-def run():
-    edges = set(traci.edge.getIDList())
-    tls = traci.trafficlight.getIDList()
-
-    """execute the TraCI control loop"""
-    step = 1
-
-    L = 4  # lost time because 2*4
-    fixed_flow = 1850
+def controller(planCache=None, flows=None):
+    """Static Webster plans for flows, by default those of the routes of generate_routefile()."""
+    if flows is not None:
+        return controllers.WebsterStatic(flows, lostTime=4, saturationFlow=1850, planCache=planCache)
     north_flow = [463, 463, 664, 664]
     south_flow = [586, 586, 285, 285]
     east_flow = [836, 576, 836, 576]
     west_flow = [404, 666, 404, 666]
+    flows = [[[north_flow[tl], south_flow[tl]], [east_flow[tl], west_flow[tl]]] for tl in range(len(north_flow))]
+    # we start with phase 2 where EW has green
+    return controllers.WebsterStatic(flows, lostTime=4, saturationFlow=1850, planCache=planCache)
 
-    for tl in range(len(tls)):
-        sat_north = north_flow[tl] / fixed_flow
-        sat_south = south_flow[tl] / fixed_flow
-        sat_east = east_flow[tl] / fixed_flow
-        sat_west = west_flow[tl] / fixed_flow
-
-        maxOfNS = max(sat_north, sat_south, 0.01)
-        maxOfEW = max(sat_east, sat_west, 0.01)
-        sumOfAllSats = maxOfNS + maxOfEW
-        d = (1.5 * L + 5) / (1 - sumOfAllSats)  # circuit time
-        GNS = (maxOfNS / sumOfAllSats) * (d - L)
-        GEW = (maxOfEW / sumOfAllSats) * (d - L)
-
-        traci.trafficlight.setPhase(tls[tl], 2)
-        traci.trafficlight.setPhaseDuration(tls[tl], GEW)
-        traci.trafficlight.setPhase(tls[tl], 0)
-        traci.trafficlight.setPhaseDuration(tls[tl], GNS)
-
-    total_vehs = 0
-    vehs = {}
-    for e in edges:
-        vehs[e] = set()
-
-    sumWait = 0
-    total_vehs = 0
 
-    # we start with phase 2 where EW has green
-    while traci.simulation.getMinExpectedNumber() > 0 and step <= MAX_STEP:
-        for e in edges:
-            vehsNow = traci.edge.getLastStepVehicleIDs(e)
-            for id in vehsNow:
-                sumWait += traci.vehicle.getWaitingTime(id)
-                total_vehs += 1
-        traci.simulationStep()
-        step += 1
-
-    print(total_vehs)
-    print(sumWait)
-    print("The total waiting time of vehicles: " + str(sumWait / total_vehs))
-    traci.close()
-    sys.stdout.flush()
+def run(netFile="data/cross2x2.net.xml"):
+    """execute the TraCI control loop"""
+    return driver.run(controller(), traci, netFile)
 
 
 def get_options():
-    optParser = optparse.OptionParser()
-    optParser.add_option("--nogui", action="store_true",
-                         default=False, help="run the commandline version of sumo")
-    options, args = optParser.parse_args()
-    return options
+    return driver.get_options("data/cross2x2.net.xml")
 
 
 # this is the main entry point of this script
 if __name__ == "__main__":
     options = get_options()
 
-    # this script has been called from the command line. It will start sumo as a
-    # server, then connect and run
-    if options.nogui:
-        sumoBinary = checkBinary('sumo')
-    else:
-        sumoBinary = checkBinary('sumo-gui')
-
     # first, generate the route file for this simulation
     generate_routefile()
 
-    # this is the normal way of using traci. sumo is started as a
-    # subprocess and then the python script connects and runs
-    traci.start([sumoBinary, "-c", "data/cross2x2.sumocfg",
-                 "--tripinfo-output", "tripinfo.xml"])
-    run()
+    traci = driver.start(options)
+    driver.main(controller(driver.plan_cache(options)), options, traci)
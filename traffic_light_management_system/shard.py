@@ -0,0 +1,92 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import time
+import optparse
+import subprocess
+import multiprocessing
+
+# we need to import python modules from the $SUMO_HOME/tools directory
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+from sumolib import checkBinary  # noqa
+from sumolib.miscutils import getFreeSocketPort  # noqa
+import traci  # noqa
+import topology  # noqa
+import driver  # noqa
+import runner  # noqa
+
+
+def regions(topo, tls, n):
+    """Split the lights into at most n regions of neighbouring lights, in row-major grid order."""
+    ordered = sorted(tls, key=lambda tl: topo.grid[tl])
+    size = -(-len(ordered) // n)
+    return [ordered[i:i + size] for i in range(0, len(ordered), size)]
+
+
+def control_region(job):
+    """Connect to the shared sumo as client number order and run the controller for region.
+
+    The clients only subscribe to the approaches and exits of their region,
+    the first one also observes the whole network for the metrics. Returns
+    order and the result of driver.run().
+    """
+    order, region, port, netFile, flowWindow = job
+    traci.init(port, numRetries=60, label="region{}".format(order))
+    # every client sends one simulationStep per step; sumo advances once all of them
+    # have, and executes their commands in the order given here
+    traci.setOrder(order)
+    return order, driver.run(runner.controller(), traci, netFile, flowWindow, lights=region,
+                             networkMetrics=order == 1)
+
+
+def run(netFile, routeFile, n, flowWindow=300, tripinfo="tripinfo.xml"):
+    """Run one simulation with its lights split over n controller processes; returns the average waiting time."""
+    topo = topology.load(netFile)
+    parts = regions(topo, topo.approaches.keys(), n)
+    port = getFreeSocketPort()
+    sumo = subprocess.Popen([checkBinary('sumo'), "-c", "data/cross2x2.sumocfg", "-n", netFile, "-r", routeFile,
+                             "--tripinfo-output", tripinfo, "--remote-port", str(port),
+                             "--num-clients", str(len(parts))])
+    pool = multiprocessing.Pool(len(parts))
+    try:
+        # results come in as the clients finish, so a failed client is seen right away
+        results = dict(pool.imap_unordered(control_region, [(order + 1, region, port, netFile, flowWindow)
+                                                            for order, region in enumerate(parts)]))
+    except BaseException:
+        # sumo and the other clients would wait for the failed client forever
+        pool.terminate()
+        sumo.kill()
+        raise
+    finally:
+        pool.close()
+        pool.join()
+        sumo.wait()
+    return results[1]
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("-n", "--net-file", default="data/cross2x3.net.xml", help="network to simulate")
+    optParser.add_option("-s", "--seed", type="int", help="seed for the generated demand, skips the prompt")
+    optParser.add_option("--regions", type="int", default=multiprocessing.cpu_count(),
+                         help="number of controller processes the lights are split over")
+    optParser.add_option("--flow-window", type="int", default=300,
+                         help="number of steps the flow estimate is averaged over")
+    options, args = optParser.parse_args()
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    runner.generate_routeFile(options.net_file, seed=options.seed)
+    start = time.time()
+    avgWait = run(options.net_file, "data/cross.rou.xml", options.regions, options.flow_window)
+    print("{} regions, average waiting time {:.3f}, {:.1f} s".format(options.regions, avgWait, time.time() - start))
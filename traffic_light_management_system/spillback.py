@@ -0,0 +1,60 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import numpy as np
+
+# phase serving the approaches of a side of the junction: 0 north/south, 2 east/west
+PHASES = {"north": 0, "south": 0, "east": 2, "west": 2}
+POLICIES = ("approach", "exit", "both", "none")
+
+
+class Spillback:
+    """Congestion overrides of every light from the occupancy of its own edges.
+
+    Every light watches its approaches and exits, both are precomputed from
+    the topology. With the approach policy a congested approach asks for the
+    green of its phase, so the queue is served before it backs up into the
+    upstream junction. With the exit policy a congested exit asks for the
+    green of the other phase, so the light stops feeding an edge that
+    spills back into it. both applies the two, an exit override winning
+    over an approach one, and none never overrides.
+
+    The occupancies of all watched edges are read at most once per step,
+    and only the lights next to a congested edge get an override.
+    """
+
+    def __init__(self, topo, tls, threshold=0.9, policy="approach"):
+        if policy not in POLICIES:
+            raise ValueError("unknown spillback policy '{}', expected one of {}".format(policy, ", ".join(POLICIES)))
+        self.threshold = threshold
+        # (light index, phase, priority) of every watched edge, exits come last so they win
+        watched = {}
+        for i, tl in enumerate(tls):
+            if policy in ("approach", "both"):
+                for direction, edges in topo.approaches[tl].items():
+                    for edge in edges:
+                        watched.setdefault(edge, []).append((i, PHASES[direction], 0))
+            if policy in ("exit", "both"):
+                for edge in topo.exits[tl]:
+                    # an exit is mostly fed by the phase of its own axis
+                    watched.setdefault(edge, []).append((i, 2 - PHASES[topo.exitDirection(tl, edge)], 1))
+        self.edges = sorted(watched)
+        self.lights = [watched[edge] for edge in self.edges]
+        self.step = None
+        self.flags = {}
+
+    def overrides(self, snapshot):
+        """Map of light index to the phase it should switch to in this step."""
+        if snapshot.step != self.step:
+            self.step = snapshot.step
+            occupancy = np.fromiter((snapshot.occupancy(e) for e in self.edges), float, len(self.edges))
+            flags = {}
+            priority = {}
+            for k in np.flatnonzero(occupancy >= self.threshold):
+                for i, phase, rank in self.lights[k]:
+                    if rank >= priority.get(i, 0):
+                        flags[i] = phase
+                        priority[i] = rank
+            self.flags = flags
+        return self.flags
+
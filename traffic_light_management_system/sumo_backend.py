@@ -0,0 +1,51 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+try:
+    import traci
+except ImportError:
+    # without sumo only the fake backend is available
+    traci = None
+
+BACKENDS = ("traci", "libsumo")
+# fake_traci.FakeTraci, a stand-in that needs no sumo
+CHOICES = BACKENDS + ("fake",)
+# options the fake backend cannot run: it keeps no sumo states and has no detectors
+FAKE_UNSUPPORTED = ("warmup", "detectors")
+
+
+def load(name="traci", gui=False):
+    """Return the module the runners use as ``traci``.
+
+    libsumo runs sumo inside this process and has no GUI, so GUI runs always
+    fall back to the socket based TraCI client. The fake backend returns a
+    new fake_traci.FakeTraci, which has no GUI either.
+    """
+    if name not in CHOICES:
+        raise ValueError("unknown backend '{}', expected one of {}".format(name, ", ".join(CHOICES)))
+    if name == "fake":
+        import fake_traci
+        return fake_traci.FakeTraci()
+    if traci is None:
+        raise ImportError("the {} backend needs sumo, set SUMO_HOME or install the traci package".format(name))
+    if name == "libsumo":
+        if gui:
+            print("libsumo cannot drive sumo-gui, falling back to traci")
+            return traci
+        import libsumo
+        return libsumo
+    return traci
+
+
+def add_option(optParser):
+    optParser.add_option("--backend", choices=CHOICES, default="traci",
+                         help="talk to sumo through traci (socket), libsumo (in-process, no GUI) or run the "
+                              "fake_traci stand-in without sumo")
+
+
+def check_options(optParser, options):
+    """Exit with a usage error when options ask for something the chosen backend cannot do."""
+    if options.backend == "fake":
+        for name in FAKE_UNSUPPORTED:
+            if getattr(options, name, None):
+                optParser.error("--{} is not supported by the fake backend".format(name))
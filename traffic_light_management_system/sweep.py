@@ -0,0 +1,151 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import csv
+import time
+import optparse
+import multiprocessing
+
+# we need to import python modules from the $SUMO_HOME/tools directory
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+from sumolib import checkBinary  # noqa
+import traci  # noqa
+import sumo_backend  # noqa
+import demand  # noqa
+import tripinfo_store  # noqa
+import warmstart  # noqa
+import driver  # noqa
+import runner  # noqa
+import runner2  # noqa
+import runner_fixed  # noqa
+
+CONTROLLERS = {
+    "webster": runner,
+    "static": runner2,
+    "fixed": runner_fixed,
+}
+
+COLUMNS = ["controller", "network", "seed", "avg_wait", "wall_time", "tripinfo"]
+
+
+def parse_seeds(text):
+    seeds = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            seeds.extend(range(int(first), int(last) + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+
+def route_file(network, seed, outDir):
+    """Write the demand of network and seed that every controller of the sweep runs on."""
+    routeFile = os.path.join(outDir, "{}_{}.rou.xml".format(os.path.basename(network).split(".")[0], seed))
+    runner.generate_routeFile(network, routeFile, seed)
+    return routeFile
+
+
+def run_job(job):
+    index, controller, network, seed, routeFile, outDir, backend, warmup = job
+    module = CONTROLLERS[controller]
+    conn = sumo_backend.load(backend)
+    name = "{}_{}_{}".format(controller, os.path.basename(network).split(".")[0], seed)
+    tripinfo = os.path.join(outDir, name + ".tripinfo.xml")
+
+    sumoCmd = [checkBinary('sumo'), "-c", "data/cross2x2.sumocfg",
+               "-n", network, "-r", routeFile, "--seed", str(seed),
+               "--tripinfo-output", tripinfo, "--no-step-log", "true"]
+    if warmup:
+        sumoCmd += ["--save-state.rng", "true"]
+    if backend != "traci":
+        # every pool process hosts at most one in-process simulation at a time
+        conn.start(sumoCmd)
+    else:
+        # every job talks to its own sumo instance through its own label
+        traci.start(sumoCmd, label="sweep{}".format(index))
+    if warmup:
+        # controllers on the same network and demand all start from one saved state
+        warmstart.restore(conn, sumoCmd, network, routeFile, warmup)
+    start = time.time()
+    params = {}
+    if controller == "static":
+        # one static plan per light from the mean flows of the shared demand
+        params["flows"] = demand.approach_flows(network, routeFile)
+    avgWait = driver.run(module.controller(**params), conn, network)
+    return {
+        "controller": controller,
+        "network": network,
+        "seed": seed,
+        "avg_wait": avgWait,
+        "wall_time": time.time() - start,
+        "tripinfo": tripinfo,
+    }
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--seeds", default="1-10", help="seeds to run, e.g. 1-100 or 1,5,9")
+    optParser.add_option("--networks", default="data/cross2x3.net.xml",
+                         help="comma separated list of net files")
+    optParser.add_option("--controllers", default="webster,fixed",
+                         help="comma separated subset of " + ",".join(sorted(CONTROLLERS)))
+    optParser.add_option("-j", "--jobs", type="int", default=multiprocessing.cpu_count(),
+                         help="number of parallel sumo instances")
+    optParser.add_option("--output-dir", default="sweep_output",
+                         help="directory for the route files and the per-run tripinfo files")
+    optParser.add_option("-o", "--output", default="sweep_results.csv", help="merged result table")
+    optParser.add_option("--store", help="also append every run's trips to this tripinfo_store database")
+    optParser.add_option("--warmup", type="int", default=0, metavar="SECONDS",
+                         help="start every run from the state after SECONDS of its demand")
+    sumo_backend.add_option(optParser)
+    options, args = optParser.parse_args()
+    sumo_backend.check_options(optParser, options)
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+
+    controllers = options.controllers.split(",")
+    for controller in controllers:
+        if controller not in CONTROLLERS:
+            sys.exit("unknown controller '{}'".format(controller))
+    jobs = []
+    for network in options.networks.split(","):
+        for seed in parse_seeds(options.seeds):
+            # all controllers run the same demand, so they also share one warm-up state
+            routeFile = route_file(network, seed, options.output_dir)
+            for controller in controllers:
+                jobs.append((len(jobs), controller, network, seed, routeFile, options.output_dir, options.backend,
+                             options.warmup))
+
+    rows = []
+    db = tripinfo_store.connect(options.store) if options.store else None
+    pool = multiprocessing.Pool(options.jobs)
+    for row in pool.imap_unordered(run_job, jobs):
+        rows.append(row)
+        print("{controller} {network} seed={seed}: {avg_wait:.3f}".format(**row))
+        if db is not None:
+            tripinfo_store.ingest(db, row["tripinfo"], row["controller"], row["seed"], row["network"])
+    pool.close()
+    pool.join()
+    if db is not None:
+        db.close()
+
+    rows.sort(key=lambda r: (r["controller"], r["network"], r["seed"]))
+    with open(options.output, "w", newline="") as results:
+        writer = csv.DictWriter(results, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print("wrote", len(rows), "results to", options.output)
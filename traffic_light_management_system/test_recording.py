@@ -0,0 +1,36 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+
+import recording
+import driver
+import runner
+
+
+def record(tmpdir, monkeypatch, *args):
+    """Run runner.py on the fake backend with args and return the trace it recorded."""
+    # the runners find the nets and the sumocfg relative to the package directory
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    routeFile = str(tmpdir.join("cross.rou.xml"))
+    trace = str(tmpdir.join("trace"))
+    monkeypatch.setattr(sys, "argv", ["runner.py", "--nogui", "--backend", "fake", "--record", trace] + list(args))
+    options = runner.get_options()
+    runner.generate_routeFile(options.net_file, routeFile, seed=1)
+    driver.main(runner.controller(), options, driver.start(options, routeFile))
+    return recording.load(trace)
+
+
+def test_record_with_end(tmpdir, monkeypatch):
+    # --end is parsed as a float, the trace must still get a whole number of rows
+    meta, arrays = record(tmpdir, monkeypatch, "--end", "1200")
+    assert meta["steps"] == 1201
+    for name, dtype, kind in recording.ARRAYS:
+        assert arrays[name].shape[0] == meta["steps"]
+
+
+def test_record_with_fractional_end(tmpdir, monkeypatch):
+    meta, arrays = record(tmpdir, monkeypatch, "--end", "99.5")
+    assert meta["steps"] == 101
+    assert arrays["phase"].shape == (101, len(meta["tls"]))
@@ -0,0 +1,148 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import pickle
+import hashlib
+import collections
+import xml.etree.ElementTree as ET
+
+DIRECTIONS = ("north", "east", "south", "west")
+CACHE_VERSION = 2
+
+
+class Topology:
+    """Traffic lights, their approaches and the grid layout of a .net.xml file.
+
+    approaches[tl][direction] lists the incoming edges of the light by the
+    side of the junction they come from, exits[tl] its outgoing edges.
+    edgeSuccessors and laneSuccessors hold the connections between normal
+    (non-internal) edges and lanes, laneLengths the length of every normal
+    lane, grid[tl] is the (row, col) of the light counted from the top left.
+    """
+
+    def __init__(self):
+        self.junctions = {}
+        self.edges = {}
+        self.lanes = {}
+        self.tlJunction = {}
+        self.approaches = {}
+        self.approachLanes = {}
+        self.exits = {}
+        self.edgeSuccessors = {}
+        self.laneSuccessors = {}
+        self.laneLengths = {}
+        self.grid = {}
+        self.rows = 0
+        self.cols = 0
+
+    def direction(self, tl, edge):
+        """Side of the light's junction the given incoming edge comes from."""
+        x, y = self.junctions[self.tlJunction[tl]][:2]
+        fx, fy = self.junctions[self.edges[edge][0]][:2]
+        dx, dy = fx - x, fy - y
+        if abs(dy) >= abs(dx):
+            return "north" if dy > 0 else "south"
+        return "east" if dx > 0 else "west"
+
+    def exitDirection(self, tl, edge):
+        """Side of the light's junction the given outgoing edge leads to."""
+        x, y = self.junctions[self.tlJunction[tl]][:2]
+        tx, ty = self.junctions[self.edges[edge][1]][:2]
+        dx, dy = tx - x, ty - y
+        if abs(dy) >= abs(dx):
+            return "north" if dy > 0 else "south"
+        return "east" if dx > 0 else "west"
+
+    def route(self, fromEdge, toEdge):
+        """Fewest edges from fromEdge to toEdge."""
+        previous = {fromEdge: None}
+        frontier = collections.deque([fromEdge])
+        while frontier and toEdge not in previous:
+            edge = frontier.popleft()
+            for successor in sorted(self.edgeSuccessors.get(edge, ())):
+                if successor not in previous:
+                    previous[successor] = edge
+                    frontier.append(successor)
+        if toEdge not in previous:
+            raise ValueError("no route from {} to {}".format(fromEdge, toEdge))
+        route = [toEdge]
+        while previous[route[-1]] is not None:
+            route.append(previous[route[-1]])
+        return route[::-1]
+
+
+def parse(netFile):
+    topo = Topology()
+    tlEdges = {}
+    context = ET.iterparse(netFile, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end":
+            continue
+        if elem.tag == "junction":
+            if elem.get("type") != "internal":
+                topo.junctions[elem.get("id")] = (float(elem.get("x")), float(elem.get("y")), elem.get("type"))
+        elif elem.tag == "edge":
+            if elem.get("function") != "internal":
+                lanes = [lane.get("id") for lane in elem.findall("lane")]
+                topo.edges[elem.get("id")] = (elem.get("from"), elem.get("to"), lanes)
+                for lane in elem.findall("lane"):
+                    topo.lanes[lane.get("id")] = elem.get("id")
+                    topo.laneLengths[lane.get("id")] = float(lane.get("length"))
+        elif elem.tag == "connection":
+            fromEdge, toEdge = elem.get("from"), elem.get("to")
+            if not fromEdge.startswith(":"):
+                fromLane = "{}_{}".format(fromEdge, elem.get("fromLane"))
+                toLane = "{}_{}".format(toEdge, elem.get("toLane"))
+                topo.edgeSuccessors.setdefault(fromEdge, set()).add(toEdge)
+                topo.laneSuccessors.setdefault(fromLane, set()).add(toLane)
+                if elem.get("tl") is not None:
+                    tlEdges.setdefault(elem.get("tl"), set()).add(fromEdge)
+        else:
+            continue
+        # only the current top level element is needed, drop what was parsed
+        root.clear()
+
+    for tl, incoming in tlEdges.items():
+        junction = topo.edges[next(iter(incoming))][1]
+        topo.tlJunction[tl] = junction
+        topo.approaches[tl] = dict((d, []) for d in DIRECTIONS)
+        topo.approachLanes[tl] = dict((d, []) for d in DIRECTIONS)
+        for edge in sorted(incoming):
+            d = topo.direction(tl, edge)
+            topo.approaches[tl][d].append(edge)
+            topo.approachLanes[tl][d].extend(topo.edges[edge][2])
+        topo.exits[tl] = sorted(e for e, (start, _, _) in topo.edges.items() if start == junction)
+
+    xs = sorted(set(topo.junctions[j][0] for j in topo.tlJunction.values()))
+    ys = sorted(set(topo.junctions[j][1] for j in topo.tlJunction.values()), reverse=True)
+    topo.rows, topo.cols = len(ys), len(xs)
+    for tl, junction in topo.tlJunction.items():
+        x, y = topo.junctions[junction][:2]
+        topo.grid[tl] = (ys.index(y), xs.index(x))
+    return topo
+
+
+def load(netFile, cacheDir=None):
+    """Return the topology of netFile, reusing the cached copy for an unchanged file."""
+    digest = hashlib.sha1()
+    with open(netFile, "rb") as net:
+        for chunk in iter(lambda: net.read(1 << 20), b""):
+            digest.update(chunk)
+    if cacheDir is None:
+        cacheDir = os.path.join(os.path.dirname(netFile), ".topology_cache")
+    cacheFile = os.path.join(cacheDir, "{}.v{}.pickle".format(digest.hexdigest(), CACHE_VERSION))
+
+    if os.path.exists(cacheFile):
+        with open(cacheFile, "rb") as cache:
+            return pickle.load(cache)
+    topo = parse(netFile)
+    if not os.path.isdir(cacheDir):
+        os.makedirs(cacheDir)
+    # write to a temporary file first so parallel runs never read half a cache
+    tmpFile = "{}.{}.tmp".format(cacheFile, os.getpid())
+    with open(tmpFile, "wb") as cache:
+        pickle.dump(topo, cache, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmpFile, cacheFile)
+    return topo
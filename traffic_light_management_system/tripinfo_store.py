@@ -0,0 +1,103 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import sys
+import sqlite3
+import optparse
+import xml.etree.ElementTree as ET
+
+FIELDS = ("duration", "waitingTime", "timeLoss", "departDelay")
+BATCH = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    controller TEXT,
+    seed INTEGER,
+    network TEXT,
+    tripinfo TEXT
+);
+CREATE TABLE IF NOT EXISTS trips (
+    run INTEGER REFERENCES runs(id),
+    vehicle TEXT,
+    duration REAL,
+    waitingTime REAL,
+    timeLoss REAL,
+    departDelay REAL
+);
+CREATE INDEX IF NOT EXISTS trips_run ON trips(run);
+CREATE INDEX IF NOT EXISTS runs_key ON runs(controller, network, seed);
+"""
+
+
+def read_tripinfos(tripinfoFile):
+    """Yield (vehicle, duration, waitingTime, timeLoss, departDelay) without keeping the tree."""
+    context = ET.iterparse(tripinfoFile, events=("start", "end"))
+    try:
+        _, root = next(context)
+        for event, elem in context:
+            if event == "end" and elem.tag == "tripinfo":
+                yield (elem.get("id"),) + tuple(float(elem.get(f, 0)) for f in FIELDS)
+                root.clear()
+    except ET.ParseError as e:
+        # sumo leaves the file unterminated when a run is aborted
+        print("{}: stopped reading at {}".format(tripinfoFile, e), file=sys.stderr)
+
+
+def connect(dbFile):
+    db = sqlite3.connect(dbFile)
+    db.executescript(SCHEMA)
+    return db
+
+
+def ingest(db, tripinfoFile, controller, seed, network):
+    """Append one run to the store and return its id."""
+    with db:
+        run = db.execute("INSERT INTO runs (controller, seed, network, tripinfo) VALUES (?, ?, ?, ?)",
+                         (controller, seed, network, tripinfoFile)).lastrowid
+        batch = []
+        for trip in read_tripinfos(tripinfoFile):
+            batch.append((run,) + trip)
+            if len(batch) == BATCH:
+                db.executemany("INSERT INTO trips VALUES (?, ?, ?, ?, ?, ?)", batch)
+                batch = []
+        db.executemany("INSERT INTO trips VALUES (?, ?, ?, ?, ?, ?)", batch)
+    return run
+
+
+def summary(db):
+    """Mean trip statistics per controller and network over all stored runs."""
+    return db.execute("""
+        SELECT r.controller, r.network, COUNT(DISTINCT r.id), COUNT(*),
+               AVG(t.duration), AVG(t.waitingTime), AVG(t.timeLoss), AVG(t.departDelay)
+        FROM trips t JOIN runs r ON t.run = r.id
+        GROUP BY r.controller, r.network
+        ORDER BY r.network, r.controller""").fetchall()
+
+
+def get_options():
+    optParser = optparse.OptionParser(usage="%prog [options] ingest TRIPINFO... | summary")
+    optParser.add_option("-d", "--db", default="tripinfo.sqlite", help="result store")
+    optParser.add_option("--controller", default="webster", help="controller that produced the tripinfo")
+    optParser.add_option("--seed", type="int", help="seed of the run")
+    optParser.add_option("--network", default="data/cross2x3.net.xml", help="network of the run")
+    options, args = optParser.parse_args()
+    if not args or args[0] not in ("ingest", "summary"):
+        optParser.error("expected 'ingest' or 'summary'")
+    return options, args
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options, args = get_options()
+    db = connect(options.db)
+    if args[0] == "ingest":
+        for tripinfoFile in args[1:]:
+            ingest(db, tripinfoFile, options.controller, options.seed, options.network)
+    else:
+        print("{:<10} {:<32} {:>5} {:>8} {:>9} {:>9} {:>9} {:>9}".format(
+            "controller", "network", "runs", "trips", "duration", "waiting", "timeLoss", "delay"))
+        for row in summary(db):
+            print("{:<10} {:<32} {:>5} {:>8} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(*row))
+    db.close()
+    sys.stdout.flush()
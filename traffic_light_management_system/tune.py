@@ -0,0 +1,292 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import json
+import math
+import random
+import sqlite3
+import optparse
+import itertools
+import multiprocessing
+
+import numpy as np
+
+# we need to import python modules from the $SUMO_HOME/tools directory
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+from sumolib import checkBinary  # noqa
+import traci  # noqa
+import sumo_backend  # noqa
+import driver  # noqa
+import runner  # noqa
+from sweep import parse_seeds  # noqa
+
+# parameter of controllers.WebsterAdaptive: (low, high, integer)
+SPACE = {
+    "lostTime": (4, 12, True),
+    "saturationFlow": (1500, 2100, False),
+    "maxCycle": (30, 120, True),
+    "firstCycle": (20, 90, True),
+    # edge occupancy is a fraction, a threshold above 1 would switch the spillback override off
+    "occupancyThreshold": (0.05, 1.0, False),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    params TEXT,
+    seed INTEGER,
+    network TEXT,
+    avg_wait REAL,
+    pruned_at INTEGER,
+    curve TEXT,
+    PRIMARY KEY (params, seed, network)
+);
+"""
+
+
+def normalize(params):
+    """Round a parameter point so that equal settings get equal cache keys."""
+    point = {}
+    for name, (low, high, integer) in SPACE.items():
+        value = min(max(params[name], low), high)
+        point[name] = int(round(value)) if integer else round(float(value), 3)
+    return point
+
+
+def key(params):
+    return json.dumps(normalize(params), sort_keys=True)
+
+
+class Strategy:
+    """Proposes parameter points; propose() returns at most n new points, none when it is done."""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def propose(self, n, history):
+        return []
+
+
+class GridSearch(Strategy):
+
+    def __init__(self, rng, levels=3):
+        Strategy.__init__(self, rng)
+        axes = [np.linspace(low, high, levels) for low, high, _ in SPACE.values()]
+        self.points = (dict(zip(SPACE, values)) for values in itertools.product(*axes))
+
+    def propose(self, n, history):
+        return list(itertools.islice(self.points, n))
+
+
+class RandomSearch(Strategy):
+
+    def __init__(self, rng, budget=50):
+        Strategy.__init__(self, rng)
+        self.budget = budget
+
+    def sample(self):
+        return dict((name, self.rng.uniform(low, high)) for name, (low, high, _) in SPACE.items())
+
+    def propose(self, n, history):
+        n = min(n, self.budget)
+        self.budget -= n
+        return [self.sample() for _ in range(n)]
+
+
+class BayesianSearch(RandomSearch):
+    """Gaussian process on the unit cube with expected improvement over random candidates."""
+
+    def __init__(self, rng, budget=50, initial=8, lengthScale=0.25, noise=1e-3, candidates=2000):
+        RandomSearch.__init__(self, rng, budget)
+        self.initial = initial
+        self.lengthScale = lengthScale
+        self.noise = noise
+        self.candidates = candidates
+
+    def scale(self, points):
+        return np.array([[(p[name] - low) / (high - low) for name, (low, high, _) in SPACE.items()]
+                         for p in points])
+
+    def kernel(self, a, b):
+        d = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        return np.exp(-0.5 * d / self.lengthScale ** 2)
+
+    def propose(self, n, history):
+        finished = [(p, score) for p, score in history if score is not None and math.isfinite(score)]
+        if len(finished) < self.initial:
+            return RandomSearch.propose(self, n, history)
+        n = min(n, self.budget)
+        self.budget -= n
+        X = self.scale([p for p, _ in finished])
+        y = np.log([score for _, score in finished])
+        mean, std = y.mean(), y.std() or 1.
+        y = (y - mean) / std
+        K = self.kernel(X, X) + self.noise * np.eye(len(X))
+        alpha = np.linalg.solve(K, y)
+
+        pool = [self.sample() for _ in range(self.candidates)]
+        C = self.scale(pool)
+        Ks = self.kernel(C, X)
+        mu = Ks @ alpha
+        sigma = np.sqrt(np.maximum(1 - np.einsum("ij,ji->i", Ks, np.linalg.solve(K, Ks.T)), 1e-12))
+        z = (y.min() - mu) / sigma
+        cdf = 0.5 * (1 + np.vectorize(math.erf)(z / math.sqrt(2)))
+        pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2 * math.pi)
+        improvement = (y.min() - mu) * cdf + sigma * pdf
+        return [pool[i] for i in np.argsort(-improvement)[:n]]
+
+
+STRATEGIES = {
+    "grid": GridSearch,
+    "random": RandomSearch,
+    "bayes": BayesianSearch,
+}
+
+
+class Pruner:
+    """driver.run() monitor that records the running average at every checkpoint.
+
+    The run is stopped once its running average exceeds margin times the
+    one of the reference curve, the best finished run on the same seed and
+    network, at the same checkpoint.
+    """
+
+    def __init__(self, reference, margin=1.25, checkpoint=300, minStep=900):
+        self.reference = dict((int(step), value) for step, value in reference.items())
+        self.margin = margin
+        self.checkpoint = checkpoint
+        self.minStep = minStep
+        self.curve = {}
+        self.prunedAt = None
+
+    def __call__(self, step, avgWait):
+        if step % self.checkpoint:
+            return False
+        self.curve[step] = avgWait
+        best = self.reference.get(step)
+        if step >= self.minStep and best is not None and avgWait > self.margin * best:
+            self.prunedAt = step
+            return True
+        return False
+
+
+def connect(dbFile):
+    db = sqlite3.connect(dbFile)
+    db.executescript(SCHEMA)
+    return db
+
+
+def reference_curve(db, seed, network):
+    row = db.execute("SELECT curve FROM results WHERE seed = ? AND network = ? AND pruned_at IS NULL "
+                     "ORDER BY avg_wait LIMIT 1", (seed, network)).fetchone()
+    return json.loads(row[0]) if row else {}
+
+
+def evaluate(job):
+    params, network, seed, routeFile, backend, reference, margin, checkpoint = job
+    conn = sumo_backend.load(backend)
+    sumoCmd = [checkBinary('sumo'), "-c", "data/cross2x2.sumocfg", "-n", network, "-r", routeFile,
+               "--seed", str(seed), "--no-step-log", "true"]
+    if backend != "traci":
+        conn.start(sumoCmd)
+    else:
+        # a pool process runs one simulation at a time
+        traci.start(sumoCmd, label="tune{}".format(os.getpid()))
+    pruner = Pruner(reference, margin, checkpoint)
+    avgWait = driver.run(runner.controller(**normalize(params)), conn, network, monitor=pruner)
+    return params, network, seed, avgWait, pruner.prunedAt, pruner.curve
+
+
+def search(strategy, db, networks, seeds, outDir, jobs=1, batch=None, backend="traci", margin=1.25,
+           checkpoint=300):
+    """Run the strategy to the end and return [(params, score)]; the score is None for pruned points.
+
+    Pruned runs are stored with pruned_at set and never count as cached
+    results, their average covers only part of the simulation.
+    """
+    routes = {}
+    for network in networks:
+        for seed in seeds:
+            routeFile = os.path.join(outDir, "{}_{}.rou.xml".format(os.path.basename(network).split(".")[0], seed))
+            runner.generate_routeFile(network, routeFile, seed)
+            routes[network, seed] = routeFile
+
+    history = []
+    pool = multiprocessing.Pool(jobs)
+    while True:
+        points = strategy.propose(batch or jobs, history)
+        if not points:
+            break
+        todo = []
+        for params in points:
+            for network in networks:
+                for seed in seeds:
+                    # a pruned run only holds a partial average, it is run again against the current reference
+                    if db.execute("SELECT 1 FROM results WHERE params = ? AND seed = ? AND network = ? "
+                                  "AND pruned_at IS NULL", (key(params), seed, network)).fetchone() is None:
+                        todo.append((normalize(params), network, seed, routes[network, seed], backend,
+                                     reference_curve(db, seed, network), margin, checkpoint))
+        for params, network, seed, avgWait, prunedAt, curve in pool.imap_unordered(evaluate, todo):
+            with db:
+                db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                           (key(params), seed, network, avgWait, prunedAt, json.dumps(curve)))
+            print("{} seed={} {}: {:.3f}{}".format(network, seed, key(params), avgWait,
+                                                     " (pruned at {})".format(prunedAt) if prunedAt else ""))
+        for params in points:
+            rows = [db.execute("SELECT avg_wait, pruned_at FROM results WHERE params = ? AND seed = ? AND network = ?",
+                               (key(params), seed, network)).fetchone() for network in networks for seed in seeds]
+            pruned = any(prunedAt is not None for _, prunedAt in rows)
+            history.append((normalize(params), None if pruned else sum(w for w, _ in rows) / len(rows)))
+    pool.close()
+    pool.join()
+    return history
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--strategy", choices=sorted(STRATEGIES), default="random",
+                         help="search strategy: " + ", ".join(sorted(STRATEGIES)))
+    optParser.add_option("--budget", type="int", default=50, help="points to evaluate (random and bayes)")
+    optParser.add_option("--levels", type="int", default=3, help="values per parameter of the grid")
+    optParser.add_option("--seeds", default="1-3", help="demand seeds every point is evaluated on")
+    optParser.add_option("--networks", default="data/cross2x3.net.xml", help="comma separated list of net files")
+    optParser.add_option("-j", "--jobs", type="int", default=multiprocessing.cpu_count(),
+                         help="number of parallel sumo instances")
+    optParser.add_option("--margin", type="float", default=1.25,
+                         help="stop a run once its average waiting time exceeds the best run's by this factor")
+    optParser.add_option("--checkpoint", type="int", default=300, help="steps between pruning checks")
+    optParser.add_option("--cache", default="tune_cache.sqlite", help="result cache shared by all searches")
+    optParser.add_option("--output-dir", default="sweep_output", help="directory for the route files")
+    optParser.add_option("--random-seed", type="int", help="seed of the search itself")
+    optParser.add_option("--top", type="int", default=5, help="number of best points to list")
+    sumo_backend.add_option(optParser)
+    options, args = optParser.parse_args()
+    return options
+
+
+# this is the main entry point of this script
+if __name__ == "__main__":
+    options = get_options()
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+    rng = random.Random(options.random_seed)
+    if options.strategy == "grid":
+        strategy = GridSearch(rng, options.levels)
+    else:
+        strategy = STRATEGIES[options.strategy](rng, options.budget)
+    db = connect(options.cache)
+    history = search(strategy, db, options.networks.split(","), parse_seeds(options.seeds), options.output_dir,
+                     options.jobs, backend=options.backend, margin=options.margin, checkpoint=options.checkpoint)
+    db.close()
+
+    finished = sorted(((score, params) for params, score in history if score is not None), key=lambda f: f[0])
+    print("{} points, {} pruned".format(len(history), len(history) - len(finished)))
+    for score, params in finished[:options.top]:
+        print("{:.3f} {}".format(score, json.dumps(params, sort_keys=True)))
+    sys.stdout.flush()
@@ -0,0 +1,48 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import hashlib
+
+
+def state_file(netFile, routeFile, warmup, cacheDir=None, modelArgs=()):
+    """Path of the saved state after warmup seconds of netFile with the demand of routeFile.
+
+    modelArgs are the sumo options of the traffic model (see
+    driver.model_args); states of different models are kept apart.
+    """
+    digest = hashlib.sha1()
+    for path in (netFile, routeFile):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    digest.update(str(warmup).encode())
+    if modelArgs:
+        digest.update(" ".join(modelArgs).encode())
+    if cacheDir is None:
+        cacheDir = os.path.join(os.path.dirname(netFile), ".state_cache")
+    return os.path.join(cacheDir, digest.hexdigest() + ".xml.gz")
+
+
+def restore(conn, sumoCmd, netFile, routeFile, warmup, cacheDir=None, modelArgs=()):
+    """Bring a simulation freshly started with sumoCmd to its warmed up state.
+
+    The first run for a network and demand simulates the first warmup
+    seconds with the programs of the net file, saves the state and reloads
+    the simulation. Every run then loads the saved state into a fresh
+    simulation, so all controllers compared on that demand start from
+    exactly the same vehicles.
+    """
+    stateFile = state_file(netFile, routeFile, warmup, cacheDir, modelArgs)
+    if not os.path.exists(stateFile):
+        cacheDir = os.path.dirname(stateFile)
+        if not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+        conn.simulationStep(warmup)
+        # save under a temporary name first so parallel runs never load half a state
+        tmpFile = "{}.{}.xml.gz".format(stateFile[:-len(".xml.gz")], os.getpid())
+        conn.simulation.saveState(tmpFile)
+        os.replace(tmpFile, stateFile)
+        conn.load(sumoCmd[1:])
+    conn.simulation.loadState(stateFile)
+    return stateFile
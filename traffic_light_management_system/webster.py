@@ -0,0 +1,31 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+import numpy as np
+
+
+def timings(flows, saturationFlow=1850, lostTime=8, maxCycle=None, minRatio=0.001):
+    """Webster cycle lengths and green splits for many lights in one call.
+
+    flows is indexed [light, phase, approach] (veh/h) or [light, phase] when
+    every phase is served by a single approach. saturationFlow broadcasts
+    against flows, lostTime and maxCycle against the lights. The busiest
+    approach of a phase decides its flow ratio. Lights whose ratios add up to
+    one or more cannot be served by the formula and get maxCycle.
+
+    Returns (cycle, greens) with shapes [light] and [light, phase].
+    """
+    flows = np.asarray(flows, dtype=float)
+    ratios = flows / saturationFlow
+    if ratios.ndim == 3:
+        ratios = ratios.max(axis=2)
+    ratios = np.maximum(ratios, minRatio)
+    lostTime = np.asarray(lostTime, dtype=float)
+
+    sumOfRatios = ratios.sum(axis=1)
+    with np.errstate(divide="ignore"):
+        cycle = (1.5 * lostTime + 5) / (1 - sumOfRatios)
+    if maxCycle is not None:
+        cycle = np.where(sumOfRatios < 1, np.minimum(cycle, maxCycle), maxCycle)
+    greens = ratios / sumOfRatios[:, None] * (cycle - lostTime)[..., None]
+    return cycle, greens